@@ -5,6 +5,7 @@ import argparse
 from pathlib import Path
 import re
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from file_inventory import read_manifest
 
 def extract_repo_info(github_url):
     """从GitHub URL中提取用户名和仓库名"""
@@ -74,8 +75,11 @@ def get_repo_folder_name(user, repo, repo_counter):
     
     return folder_name
 
-def process_server(server, repos_dir, repo_counter):
-    """处理单个服务器项目，统计信息并更新"""
+def process_server(server, repos_dir, repo_counter, server_dirs=None):
+    """处理单个服务器项目，统计信息并更新
+
+    server_dirs 为文件清单中的 {文件夹名称 -> 清单记录}，为None时直接检查目录
+    """
     github_url = server.get('github_url', '')
     if not github_url:
         return server, False
@@ -90,7 +94,13 @@ def process_server(server, repos_dir, repo_counter):
     repo_path = os.path.join(repos_dir, folder_name)
     
     # 检查仓库是否存在
-    if not os.path.exists(repo_path) or not os.path.exists(os.path.join(repo_path, '.git')):
+    if server_dirs is not None:
+        server_dir = server_dirs.get(folder_name)
+        if server_dir is None or not server_dir.is_git:
+            print(f"仓库不存在: {repo_path}")
+            return server, False
+        repo_path = server_dir.path
+    elif not os.path.exists(repo_path) or not os.path.exists(os.path.join(repo_path, '.git')):
         print(f"仓库不存在: {repo_path}")
         return server, False
     
@@ -117,6 +127,8 @@ def main():
                        help='输出文件路径，默认为覆盖原文件')
     parser.add_argument('--threads', type=int, default=4, 
                        help='并发线程数，默认为4')
+    parser.add_argument('--manifest', default=None,
+                       help='file_inventory.py 生成的文件清单路径，指定后通过清单查找仓库目录')
     args = parser.parse_args()
     
     # 转换为绝对路径
@@ -147,13 +159,24 @@ def main():
     # 创建仓库计数器
     repo_counter = {}
     
+    # 从文件清单读取仓库目录
+    server_dirs = None
+    if args.manifest:
+        try:
+            manifest = read_manifest(args.manifest, base_dir=repos_dir, layout='flat')
+        except ValueError as e:
+            print(f"错误: {e}")
+            return
+        server_dirs = {server_dir.server: server_dir for server_dir in manifest}
+        print(f"从文件清单加载了 {len(server_dirs)} 个仓库目录: {args.manifest}")
+    
     # 使用线程池并发处理
     updated_servers = []
     success_count = 0
     
     with ThreadPoolExecutor(max_workers=args.threads) as executor:
         # 提交所有任务
-        future_to_server = {executor.submit(process_server, server, repos_dir, repo_counter): i 
+        future_to_server = {executor.submit(process_server, server, repos_dir, repo_counter, server_dirs): i 
                            for i, server in enumerate(servers)}
         
         # 按完成顺序处理结果
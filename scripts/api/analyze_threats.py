@@ -7,7 +7,7 @@ from threat_analyzer import analyze_threats, generate_chart, save_server_details
 
 def main():
     parser = argparse.ArgumentParser(description='分析MCP Server威胁类型')
-    parser.add_argument('-f', '--file', help='要分析的JSON文件路径', default='')
+    parser.add_argument('-f', '--file', help='要分析的JSON文件路径，也可以是 analyzer.py --columnar 按列保存的 .parquet / .npz 文件、--db 的结果数据库或 threat_cube_*.cube.npz', default='')
     parser.add_argument('-o', '--output-dir', help='输出目录', default='./output')
     args = parser.parse_args()
     
@@ -2,22 +2,164 @@ import os
 import sys
 import json
 import traceback
-from typing import Dict, List, Any
+import hashlib
+import subprocess
+from typing import Dict, List, Any, Optional, Tuple
 import ast
 import time
 from datetime import datetime
-from dangerous_apis import get_checker
+# 使 scripts 目录下的公共模块（如 file_inventory）可以被导入
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dangerous_apis import get_checker, get_ruleset_version
+from api_matcher import get_matcher, get_prefilter
+from findings_cache import FindingsCache, git_blob_sha
+from findings_sink import FindingsSink
+from findings_columns import COLUMNAR_FORMATS, summarize_servers, write_columns
+from results_db import RESULTS_DB_SUFFIXES, ResultsDB
+from finding import Finding
+from scan_journal import ScanJournal
+from generated_files import GENERATED_POLICIES, GENERATED_SCAN, GENERATED_SKIP, GENERATED_TAG, detect_generated
+from source_reader import READ_BINARY, READ_DECODE_ERROR, READ_MMAP, READ_TEXT, iter_text_chunks, open_source
+from line_index import FUNCTION_TIME_BUDGET, MAX_LINE_LENGTH, LineIndex, function_deadline, line_local_pattern
+from lexical_mask import build_mask
+from file_inventory import DEFAULT_EXCLUDED_DIRS, is_stale, list_server_dirs, read_manifest, scan_server_files
 import argparse
 import re
-import pandas as pd  # 新增pandas用于处理Excel数据
-import requests      # 新增requests用于调用GitHub API
-from collections import defaultdict  # 新增defaultdict用于数据统计
+# pandas（读取Excel）和requests（调用GitHub API）只在用到的函数中导入，普通扫描不必加载
+from bisect import bisect_left
+from collections import Counter, defaultdict  # 新增defaultdict用于数据统计
+from concurrent.futures import ProcessPoolExecutor
+
+# 分析引擎版本，分析逻辑改变（导致同一文件的结果不同）时需要更新，使缓存失效
+ANALYZER_VERSION = '1.5'
+
+# 支持分析的语言
+SUPPORTED_LANGUAGES = [
+    'python',
+    'typescript',
+    'rust',
+    'go',
+    'java',
+    'c',
+    'cpp',
+    'csharp',
+    'ruby',
+    'php',
+    'swift',
+    'kotlin'
+]
+
+# 安全统计表的星星数范围上界（包含），即 0-10、11-100、101-1000、1001-10000、10001-50000、50000+，可用 --star-edges 修改
+STAR_EDGES = (10, 100, 1000, 10000, 50000)
+STAR_EDGES_HELP = '安全统计表的星星数范围上界（包含），逗号分隔 (默认: 10,100,1000,10000,50000)'
+# 分析开始时打印的仓库星星数分布的范围上界
+STAR_HISTOGRAM_EDGES = (10, 100, 500, 1000, 10000, 50000)
+# generate_security_table 的 cube 参数默认值：调用方没有构建过威胁统计立方体（None 表示构建过但未安装numpy）
+_CUBE_NOT_BUILT = object()
+
+
+def shard_of(server_name: str, shard_count: int) -> int:
+    """按服务器目录名称的哈希值计算服务器所属的分片（与机器、目录遍历顺序和 PYTHONHASHSEED 无关）"""
+    digest = hashlib.sha1(server_name.encode('utf-8')).hexdigest()
+    return int(digest, 16) % shard_count
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """解析 --shard 参数，格式为 i/N（0 <= i < N）"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"分片格式应为 i/N，例如 0/4: {value}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"分片编号应满足 0 <= i < N: {value}")
+    return index, count
+
+
+def parse_star_edges(value: str) -> Tuple[int, ...]:
+    """解析 --star-edges 参数，格式为逗号分隔的递增正整数，如 10,100,1000"""
+    try:
+        edges = tuple(int(part) for part in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"星星数范围的上界应为逗号分隔的整数，例如 10,100,1000: {value}")
+    if not edges or edges[0] < 0 or any(low >= high for low, high in zip(edges, edges[1:])):
+        raise argparse.ArgumentTypeError(f"星星数范围的上界应为递增的非负整数: {value}")
+    return edges
+
+
+def get_star_range_labels(star_edges: Tuple[int, ...]) -> List[str]:
+    """星星数范围的显示标签，如 (10, 100) -> ['0-10', '11-100', '100+']"""
+    lows = (0,) + tuple(edge + 1 for edge in star_edges[:-1])
+    return [f"{low}-{high}" for low, high in zip(lows, star_edges)] + [f"{star_edges[-1]}+"]
+
+
+def star_bucket(star_count, star_edges: Tuple[int, ...]) -> int:
+    """星星数所属的范围编号（star_edges 为各范围的上界，包含），与 threat_cube.star_buckets 相同，不依赖numpy"""
+    return bisect_left(star_edges, star_count)
+
+
+def count_star_ranges(star_counts: List[Any], star_edges: Tuple[int, ...]) -> List[int]:
+    """统计落在各星星数范围内的数量（负数不计入），安装了numpy时用一次 np.digitize 计算，否则逐个二分查找"""
+    try:
+        from threat_cube import star_histogram  # 依赖numpy，只在需要时加载
+    except ImportError:
+        range_counts = [0] * (len(star_edges) + 1)
+        for star_count in star_counts:
+            if star_count >= 0:
+                range_counts[star_bucket(star_count, star_edges)] += 1
+        return range_counts
+    return star_histogram(star_counts, star_edges)
+
+
+def _new_finding(file_path: str, line: int, column: int, api_name: str, function: str, checker: Any) -> Finding:
+    """创建单条分析结果，引用规则表中的描述、威胁类型和资源类型，汇总时不必再查找规则表"""
+    return Finding(file_path, line, column, api_name, checker.rules[api_name], function)
+
+
+def _findings_from_json(language_results: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Finding]]:
+    """把JSON中读取的 {语言 -> 结果字典列表} 转换为 Finding"""
+    return {
+        language: [Finding.from_dict(finding) for finding in findings]
+        for language, findings in language_results.items()
+    }
+
 
 class CodeAnalyzer:
-    def __init__(self, base_dir: str = "../mcp_servers", max_servers: int = None, excel_path: str = None, json_path: str = None):
+    def __init__(self, base_dir: str = "../mcp_servers", max_servers: int = None, excel_path: str = None, json_path: str = None,
+                 workers: int = 1, cache_path: str = None, force_rescan: bool = False, manifest_path: str = None,
+                 findings_jsonl: str = None, generated_policy: str = GENERATED_SCAN, shard: Tuple[int, int] = None,
+                 verify_manifest: bool = False, journal_path: str = None, resume: bool = False, git_updates_path: str = None,
+                 columnar_format: str = None, results_db_path: str = None, star_edges: Tuple[int, ...] = None):
         # 确保base_dir是绝对路径
         self.base_dir = os.path.abspath(base_dir)
         self.max_servers = max_servers  # None表示不限制
+        self.workers = max(1, workers or 1)  # 并行扫描的进程数，1表示串行
+        self.cache_path = cache_path    # 单文件分析结果缓存的路径，None表示不使用缓存
+        self.findings_cache = None
+        self.force_rescan = force_rescan  # True时忽略.git目录中已保存的服务器分析结果
+        self.manifest_path = manifest_path  # file_inventory.py 生成的文件清单，None表示直接遍历目录
+        self.verify_manifest = verify_manifest  # True时逐个检查清单中文件的大小和修改时间，否则只检查目录的修改时间
+        self.findings_jsonl = findings_jsonl  # 流式写出API调用的JSON Lines文件，None表示运行结束后统一保存
+        self.findings_sink = None
+        self.columnar_format = columnar_format  # 按列另存分析结果的格式 (auto / parquet / npz)，None表示不保存
+        self.results_db_path = results_db_path  # 逐个服务器更新的SQLite结果数据库，None表示不使用
+        self.results_db = None
+        self.star_edges = tuple(star_edges or STAR_EDGES)  # 安全统计表的星星数范围上界
+        self.read_stats = Counter()     # 文件读取结果 -> 文件数（text / mmap / binary / decode_error）
+        self.generated_policy = generated_policy  # 生成文件和压缩文件的处理策略: scan / tag / skip
+        self.generated_stats = Counter()  # 识别原因 -> 生成文件数
+        self.generated_by_server = {}   # 服务器名称 -> {识别原因 -> 生成文件数}
+        self.degraded_scans = []        # 降级扫描记录（超长行 / 超出时间预算）
+        self.blob_findings = {}         # (git blob SHA, 语言) -> (读取结果, 分析结果, 降级扫描记录)，内容相同的文件只分析一次
+        self.empty_blobs = {}           # 语言 -> {读取结果 -> 没有分析结果和降级扫描记录的 blob SHA（20字节摘要）集合}
+        self.dedupe_stats = Counter()   # unique_files / unique_bytes / duplicate_files / duplicate_bytes
+        self.shard = shard              # (分片编号, 分片总数)，None表示分析所有服务器
+        self.server_positions = {}      # 服务器名称 -> 在完整服务器列表中的位置（合并分片结果时用于恢复顺序）
+        self.journal_path = journal_path  # 按服务器记录的检查点日志，None表示不记录
+        self.resume = resume            # True时跳过检查点日志中已完成的服务器
+        self.scan_journal = None
+        self.git_updates_path = git_updates_path  # update_git_repos.py 记录的各仓库更新前后的HEAD，None表示不做增量分析
+        self.git_updates = {}           # 服务器目录的绝对路径 -> (更新前的HEAD, 更新后的HEAD)
+        self._ruleset_versions = {}     # 语言 -> 规则集版本
         self.excel_path = excel_path    # 新增Excel文件路径
         self.json_path = json_path      # 新增JSON文件路径
         self.results: Dict[str, List[Dict[str, Any]]] = {} 
@@ -28,30 +170,11 @@ class CodeAnalyzer:
         self.repo_stars = {}                      # 用于存储仓库->星星数量的映射
         self.repo_to_server_mapping = {}          # 用于存储仓库到服务器的映射
         self.server_to_repo_mapping = {}          # 用于存储服务器到仓库的映射
+        self.server_categories = {}               # 服务器名称 -> 该服务器为所属仓库添加的类别列表
         self.server_languages = {}                # 用于存储服务器->语言的映射
 
         # 添加需要排除的目录
-        self.excluded_dirs = {
-            'node_modules',
-            'venv',
-            '.git',
-            '__pycache__',
-            'dist',
-            'build',
-            'target',  # Rust的构建目录
-            'vendor',  # Go的依赖目录
-            'packages', # NuGet包目录
-            'bin',
-            'obj',     # .NET构建目录
-            'lib',
-            'libs',
-            'external',
-            'third_party',
-            'third-party',
-            'ext',
-            'deps',
-            'dependencies'
-        }
+        self.excluded_dirs = set(DEFAULT_EXCLUDED_DIRS)
         
     def load_json_data(self):
         """加载merged_servers.json文件中的仓库数据"""
@@ -214,6 +337,7 @@ class CodeAnalyzer:
                 traceback.print_exc()
         elif self.excel_path and os.path.exists(self.excel_path):
             try:
+                import pandas as pd  # 只在读取Excel时加载
                 df = pd.read_excel(self.excel_path)
                 print(f"\n从Excel加载仓库数据: {self.excel_path}")
                 print(f"Excel数据行数: {len(df)}")
@@ -485,28 +609,80 @@ class CodeAnalyzer:
         
         try:
             abs_path = os.path.abspath(file_path)
-            try:
-                with open(abs_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                # pass
-                content = ''
-                # 如果 UTF-8 失败，尝试 GBK
-                # with open(abs_path, 'r', encoding='gbk') as f:
-                #     content = f.read()
-                
-            # 根据不同语言选择分析方法
-            if language == "python":
-                try:
-                    findings.extend(self._analyze_python_file_ast(content, abs_path, checker))
-                except SyntaxError as e:
-                    print(f"\nSyntax error in Python file: {abs_path}")
-                    print(f"Error details: {str(e)}")
-                    print("Falling back to text-based analysis...")
-                    findings.extend(self._analyze_file_by_text(content, abs_path, checker))
-            else:
-                # 对其他语言使用文本分析
-                findings.extend(self._analyze_file_by_text(content, abs_path, checker))
+            with open_source(abs_path) as (read_kind, data):
+                # 二进制文件和无法按UTF-8解码的大文件按空内容处理
+                if data is None:
+                    self.read_stats[read_kind] += 1
+                    return findings
+
+                # 生成文件和压缩文件按策略跳过或标记
+                generated_reason = detect_generated(abs_path, data)
+                if generated_reason:
+                    self.generated_stats[generated_reason] += 1
+                    if self.generated_policy == GENERATED_SKIP:
+                        return findings
+
+                # 本次运行中已分析过内容相同的文件（镜像、fork、重复克隆的仓库）时，直接复用它的结果
+                blob_sha = git_blob_sha(data)
+                blob_key = (blob_sha, language)
+                shared = self.blob_findings.get(blob_key) or self._find_empty_blob(blob_sha, language)
+                if shared is not None:
+                    shared_read_kind, shared_findings, shared_degraded = shared
+                    self.read_stats[shared_read_kind] += 1
+                    self.dedupe_stats["duplicate_files"] += 1
+                    self.dedupe_stats["duplicate_bytes"] += len(data)
+                    self.degraded_scans.extend(dict(record, file=abs_path) for record in shared_degraded)
+                    findings = [finding.copy(file=abs_path) for finding in shared_findings]
+                    return self._tag_generated(findings, generated_reason)
+                self.dedupe_stats["unique_files"] += 1
+                self.dedupe_stats["unique_bytes"] += len(data)
+
+                # 文件内容和规则集都未变化时，直接复用缓存的分析结果
+                if self.findings_cache is not None:
+                    cached_findings = self.findings_cache.get(blob_sha, language, self._get_ruleset_version(language), abs_path)
+                    if cached_findings is not None:
+                        cached_findings = [Finding.from_dict(finding) for finding in cached_findings]
+                        self.read_stats[read_kind] += 1
+                        self._share_blob_findings(blob_key, read_kind, cached_findings, [])
+                        return self._tag_generated(cached_findings, generated_reason)
+
+                # 根据不同语言选择分析方法
+                degraded_before = len(self.degraded_scans)
+                if language == "python" and not get_prefilter(checker).may_match(data):
+                    # Python文件先做字节级预筛选：不含任何规则名称的文件不可能有命中，跳过解码和AST构建
+                    pass
+                elif language != "python" and read_kind == READ_MMAP:
+                    # 大文件直接在mmap的字节上做文本分析，不构建完整的 str
+                    findings.extend(self._analyze_file_by_text(data, abs_path, checker))
+                else:
+                    content = self._decode_source(data)
+                    if content is None:
+                        # 无法按UTF-8解码的文件按空内容处理
+                        read_kind = READ_DECODE_ERROR
+                    elif language == "python":
+                        try:
+                            findings.extend(self._analyze_python_file_ast(content, abs_path, checker))
+                        except SyntaxError as e:
+                            print(f"\nSyntax error in Python file: {abs_path}")
+                            print(f"Error details: {str(e)}")
+                            print("Falling back to text-based analysis...")
+                            findings.extend(self._analyze_file_by_text(content, abs_path, checker))
+                    else:
+                        # 对其他语言使用文本分析
+                        findings.extend(self._analyze_file_by_text(content, abs_path, checker))
+                self.read_stats[read_kind] += 1
+                for finding in findings:
+                    finding["language"] = language
+
+                # 超出时间预算的结果与机器负载有关，不写入缓存
+                time_budget_exceeded = any(
+                    "time_budget" in record["reasons"] for record in self.degraded_scans[degraded_before:]
+                )
+                if not time_budget_exceeded:
+                    if self.findings_cache is not None:
+                        self.findings_cache.put(blob_sha, language, self._get_ruleset_version(language), findings)
+                    self._share_blob_findings(blob_key, read_kind, findings, self.degraded_scans[degraded_before:])
+                findings = self._tag_generated(findings, generated_reason)
                 
         except Exception as e:
             print(f"\nError analyzing {abs_path}")
@@ -516,6 +692,78 @@ class CodeAnalyzer:
             traceback.print_exc()
             
         return findings
+
+    def _share_blob_findings(self, blob_key: Tuple[str, str], read_kind: str, findings: List[Dict[str, Any]],
+                             degraded_scans: List[Dict[str, Any]]):
+        """
+        记录一个文件内容的分析结果和降级扫描记录（去掉文件路径后保存副本），供内容相同的其他文件复用
+
+        大部分文件没有分析结果，这些文件只按语言和读取结果在集合中记录20字节的摘要，不保存完整的记录
+        """
+        if not findings and not degraded_scans:
+            blob_sha, language = blob_key
+            self.empty_blobs.setdefault(language, {}).setdefault(read_kind, set()).add(bytes.fromhex(blob_sha))
+            return
+        self.blob_findings[blob_key] = (
+            read_kind,
+            tuple(finding.copy(file=None) for finding in findings),
+            tuple({key: value for key, value in record.items() if key != "file"} for record in degraded_scans)
+        )
+
+    def _find_empty_blob(self, blob_sha: str, language: str) -> Optional[Tuple[str, tuple, tuple]]:
+        """查找没有分析结果的文件内容，返回与 blob_findings 相同格式的 (读取结果, (), ())，没有记录时返回None"""
+        empty_by_read_kind = self.empty_blobs.get(language)
+        if not empty_by_read_kind:
+            return None
+        digest = bytes.fromhex(blob_sha)
+        for read_kind, digests in empty_by_read_kind.items():
+            if digest in digests:
+                return read_kind, (), ()
+        return None
+
+    def _tag_generated(self, findings: List[Dict[str, Any]], generated_reason: Optional[str]) -> List[Dict[str, Any]]:
+        """tag 策略下，在生成文件的每条结果中记录识别原因（缓存中保存的是未标记的结果）"""
+        if generated_reason and self.generated_policy == GENERATED_TAG:
+            for finding in findings:
+                finding["generated"] = generated_reason
+        return findings
+
+    def _decode_source(self, data) -> Optional[str]:
+        """按UTF-8解码文件内容（bytes 或 mmap），换行符的处理与文本模式读取一致；无法解码时返回None"""
+        try:
+            content = str(data, 'utf-8')
+        except UnicodeDecodeError:
+            # pass
+            return None
+            # 如果 UTF-8 失败，尝试 GBK
+            # content = data.decode('gbk')
+        return content.replace('\r\n', '\n').replace('\r', '\n')
+
+    def _get_ruleset_version(self, language: str) -> str:
+        """获取语言的缓存版本（分析引擎版本 + 规则表内容哈希）"""
+        version = self._ruleset_versions.get(language)
+        if version is None:
+            version = f"{ANALYZER_VERSION}-{get_ruleset_version(language)}"
+            self._ruleset_versions[language] = version
+        return version
+
+    def open_findings_cache(self):
+        """打开单文件分析结果缓存，并清理规则集已过期的条目"""
+        if not self.cache_path or self.findings_cache is not None:
+            return
+        self.findings_cache = FindingsCache(self.cache_path)
+        removed = self.findings_cache.prune({
+            language: self._get_ruleset_version(language) for language in SUPPORTED_LANGUAGES
+        })
+        print(f"使用分析结果缓存: {self.cache_path} (清理过期条目 {removed} 条)")
+
+    def close_findings_cache(self):
+        """关闭单文件分析结果缓存"""
+        if self.findings_cache is None:
+            return
+        print(f"分析结果缓存: 命中 {self.findings_cache.hits} 个文件，未命中 {self.findings_cache.misses} 个文件")
+        self.findings_cache.close()
+        self.findings_cache = None
     
     def _analyze_python_file_ast(self, content: str, file_path: str, checker: Any) -> List[Dict[str, Any]]:
         """使用AST分析Python文件"""
@@ -536,36 +784,22 @@ class CodeAnalyzer:
                 if isinstance(node.func, ast.Name):
                     api_name = node.func.id
                     if checker.is_dangerous_api(api_name):
-                        findings.append({
-                            "file": file_path,
-                            "line": node.lineno,
-                            "column": node.col_offset,
-                            "api_name": api_name,
-                            "function": function_stack[-1] if function_stack else "<module>",
-                            "description": checker.get_api_description(api_name),
-                            "threat_type": checker.get_api_threat_type(api_name)
-                        })
+                        findings.append(_new_finding(file_path, node.lineno, node.col_offset, api_name,
+                                                     function_stack[-1] if function_stack else "<module>", checker))
                 elif isinstance(node.func, ast.Attribute):
                     if isinstance(node.func.value, ast.Name):
                         api_name = f"{node.func.value.id}.{node.func.attr}"
                         if checker.is_dangerous_api(api_name):
-                            findings.append({
-                                "file": file_path,
-                                "line": node.lineno,
-                                "column": node.col_offset,
-                                "api_name": api_name,
-                                "function": function_stack[-1] if function_stack else "<module>",
-                                "description": checker.get_api_description(api_name),
-                                "threat_type": checker.get_api_threat_type(api_name)
-                            })
+                            findings.append(_new_finding(file_path, node.lineno, node.col_offset, api_name,
+                                                         function_stack[-1] if function_stack else "<module>", checker))
                 self.generic_visit(node)
         
         visitor = FunctionVisitor()
         visitor.visit(tree)
         return findings
     
-    def _analyze_file_by_text(self, content: str, file_path: str, checker: Any) -> List[Dict[str, Any]]:
-        """基于文本的分析方法"""
+    def _analyze_file_by_text(self, content, file_path: str, checker: Any) -> List[Dict[str, Any]]:
+        """基于文本的分析方法（content 为解码后的 str，或大文件的 mmap）"""
         findings = []
         
         # 各语言的注释标记
@@ -612,43 +846,97 @@ class CodeAnalyzer:
         comment_marker = comment_markers.get(language, "#")
         function_pattern = function_patterns.get(language, r"\w+")
         
-        # 初始化变量
-        lines = content.split("\n")
-        current_function = "<module>"  # 默认为模块级别
-        
-        for i, line in enumerate(lines, 1):
-            # 更新当前函数名
-            match = re.search(function_pattern, line)
-            if match:
-                current_function = match.group(1)
-                
-            # 检查危险API
-            for api in checker.dangerous_apis:
-                if api in line:
-                    # 检查是否是注释行
-                    stripped_line = line.lstrip()
-                    if stripped_line.startswith(comment_marker):
-                        continue
-                        
-                    # 确保这是一个完整的API调用，而不是变量名的一部分
-                    if self._is_valid_api_usage(api, line):
-                        findings.append({
-                            "file": file_path,
-                            "line": i,
-                            "column": line.index(api),
-                            "api_name": api,
-                            "function": current_function,
-                            "description": checker.get_api_description(api),
-                            "threat_type": checker.get_api_threat_type(api)
-                        })
-        
+        function_regex = re.compile(line_local_pattern(function_pattern))
+        matcher = get_matcher(checker)
+        deadline = function_deadline()  # 单个文件识别函数定义的时间预算
+
+        if isinstance(content, str):
+            index = self._analyze_text_block(content, 0, "<module>", deadline, file_path, checker, matcher,
+                                             function_regex, comment_marker, language, findings)
+            long_lines, time_budget_exceeded = index.long_lines, index.time_budget_exceeded
+        else:
+            # mmap：按行边界分段解码后逐段分析（API和函数定义都不会跨行），同一时间只有一段内容以 str 形式存在
+            # 词法掩码也按段计算，跨越分段边界的块注释/多行字符串可能识别不准确
+            current_function = "<module>"  # 默认为模块级别
+            long_lines, time_budget_exceeded = 0, False
+            for line_offset, chunk in iter_text_chunks(content):
+                index = self._analyze_text_block(chunk, line_offset, current_function, deadline, file_path, checker,
+                                                 matcher, function_regex, comment_marker, language, findings)
+                current_function = index.last_function
+                long_lines += index.long_lines
+                time_budget_exceeded = time_budget_exceeded or index.time_budget_exceeded
+
+        if long_lines or time_budget_exceeded:
+            self._record_degraded_scan(file_path, long_lines, time_budget_exceeded)
         return findings
+
+    def _record_degraded_scan(self, file_path: str, long_lines: int, time_budget_exceeded: bool):
+        """记录降级扫描：超长行或超出时间预算的内容改用关键字匹配识别函数定义，结果中的函数名可能不准确"""
+        reasons = []
+        if long_lines:
+            reasons.append("long_lines")
+        if time_budget_exceeded:
+            reasons.append("time_budget")
+        self.degraded_scans.append({
+            "file": file_path,
+            "reasons": reasons,
+            "long_lines": long_lines,
+            "max_line_length": MAX_LINE_LENGTH,
+            "time_budget": FUNCTION_TIME_BUDGET
+        })
+
+    def _analyze_text_block(self, content: str, line_offset: int, initial_function: str, deadline: float,
+                            file_path: str, checker: Any, matcher: Any, function_regex: Any, comment_marker: str,
+                            language: str, findings: List[Dict[str, Any]]) -> LineIndex:
+        """
+        分析一段文本内容，结果追加到 findings，返回该段的行索引（包含末尾所在的函数和降级扫描信息）
+
+        用编译后的匹配器一次扫描整段内容，通过行索引得到每个命中的行号和所在函数，不含命中的行不做任何处理；
+        起始位置位于注释（块注释、文档注释）或字符串字面量中的命中由词法掩码直接排除（本身写在字符串中的API，如 Ruby 的 'open-uri'，除外）
+        """
+        index = LineIndex(content, function_regex, initial_function, deadline)
+        mask = build_mask(content, language)
+
+        # 按行归集命中 {行号: [(列号, API名称)]}
+        # 每行每个API只保留第一次出现的位置，与 line.index(api) 的语义一致
+        hits_by_line = {}
+        seen_hits = set()
+        for pos, api in matcher.finditer(content):
+            if mask is not None and mask[pos] and api not in matcher.literal_apis:
+                continue
+            line = index.line_of(pos)
+            if (line, api) in seen_hits:
+                continue
+            seen_hits.add((line, api))
+            hits_by_line.setdefault(line, []).append((pos - index.line_start(line), api))
+
+        for line, line_hits in hits_by_line.items():
+            line_text = index.line_text(line)
+
+            # 检查是否是注释行
+            stripped_line = line_text.lstrip()
+            if stripped_line.startswith(comment_marker):
+                continue
+
+            current_function = index.function_at(line)
+            for column, api in line_hits:
+                # 确保这是一个完整的API调用，而不是变量名的一部分（检查命中位置本身，而不是行内第一次出现的位置）
+                if self._is_valid_api_usage(api, line_text, column):
+                    findings.append(_new_finding(file_path, line_offset + line + 1, column, api, current_function,
+                                                 checker))
+
+        return index
     
-    def _is_valid_api_usage(self, api: str, line: str) -> bool:
-        """检查是否是有效的API使用，而不是变量名或注释的一部分"""
+    def _is_valid_api_usage(self, api: str, line: str, index: Optional[int] = None) -> bool:
+        """
+        检查是否是有效的API使用，而不是变量名或注释的一部分
+
+        index 为API在行内的位置，为None时使用行内第一次出现的位置
+        """
         # 简单的检查：API前后应该是空白字符、括号、点或者行的开始/结束
-        index = line.find(api)
-        if index == -1:
+        if index is None:
+            index = line.find(api)
+        if index == -1 or not line.startswith(api, index):
             return False
             
         # 检查API前面的字符
@@ -674,38 +962,22 @@ class CodeAnalyzer:
             print(f"Base directory not found: {self.base_dir}")
             return findings
             
-        # 遍历所有文件
-        for root, dirs, files in os.walk(self.base_dir):
-            # 从遍历列表中移除需要排除的目录
-            dirs[:] = [d for d in dirs if d not in self.excluded_dirs]
-            
+        # 遍历所有服务器目录（或读取文件清单）
+        for server in self.get_server_inventory():
+            server_name = server.server
             # 检查是否达到服务器数量限制
-            if self.max_servers and len(self.analyzed_servers) >= self.max_servers:
+            if self.max_servers and len(self.analyzed_servers) >= self.max_servers and server_name not in self.analyzed_servers:
                 print(f"\nReached maximum number of servers to analyze ({self.max_servers})")
                 break
+            self.analyzed_servers.add(server_name)
+
+            files = server.files
+            if files is None:
+                files = scan_server_files(server.path, self.excluded_dirs)
                 
-            for file in files:
-                file_path = os.path.join(root, file)
+            for file_entry in files:
+                file_path = os.path.join(server.path, file_entry.path)
                 file_path = os.path.normpath(file_path)  # 标准化路径
-                
-                # 检查文件是否在排除目录中
-                if any(excluded in file_path.split(os.sep) for excluded in self.excluded_dirs):
-                    continue
-                    
-                # 获取服务器名称
-                try:
-                    path_parts = file_path.split(os.sep)
-                    mcp_servers_index = path_parts.index("mcp_servers")
-                    # 确保路径结构符合 mcp_servers/language/server_name
-                    if len(path_parts) > mcp_servers_index + 2:
-                        language_dir = path_parts[mcp_servers_index + 1]  # 语言目录
-                        server_name = path_parts[mcp_servers_index + 2]   # 服务器名称
-                        # 如果已经达到最大服务器数且不是已分析的服务器，则跳过
-                        if self.max_servers and len(self.analyzed_servers) >= self.max_servers and server_name not in self.analyzed_servers:
-                            continue
-                        self.analyzed_servers.add(server_name)
-                except ValueError:
-                    continue
                     
                 # 获取文件语言
                 file_language = self.get_language_by_extension(file_path)
@@ -720,6 +992,8 @@ class CodeAnalyzer:
                     file_findings = self.analyze_file(file_path, file_language)
                     if file_findings:
                         print(f"Found {len(file_findings)} potential issues")
+                        for finding in file_findings:
+                            finding["server"] = server_name
                         findings.extend(file_findings)
                         
         return findings
@@ -780,13 +1054,15 @@ class CodeAnalyzer:
 
 
 
-    def save_analysis_result(self, server_path, language_results):
+    def save_analysis_result(self, server_path, language_results, head=None, ruleset_version=None):
         """
         保存分析结果到服务器的.git目录
         
         Args:
             server_path: 服务器目录路径
             language_results: 分析结果字典
+            head: 分析时仓库的HEAD提交
+            ruleset_version: 分析时使用的规则集版本
         """
         git_dir = os.path.join(server_path, '.git')
         if not os.path.exists(git_dir):
@@ -799,29 +1075,33 @@ class CodeAnalyzer:
         # 添加元数据
         analysis_data = {
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'version': '1.0',  # 分析工具版本
+            'version': ANALYZER_VERSION,  # 分析工具版本
+            'head': head,
+            'ruleset_version': ruleset_version,
             'results': language_results,
         }
         
         try:
             # 保存到JSON文件
             with open(result_file, 'w', encoding='utf-8') as f:
-                json.dump(analysis_data, f, ensure_ascii=False, indent=2)
+                json.dump(analysis_data, f, ensure_ascii=False, indent=2, default=dict)
             print(f"分析结果已保存到: {result_file}")
             return True
         except Exception as e:
             print(f"保存分析结果到 {result_file} 失败: {str(e)}")
             return False
 
-    def load_analysis_result(self, server_path):
+    def load_analysis_result(self, server_path, head=None, ruleset_version=None):
         """
         从.git目录加载已保存的分析结果
         
         Args:
             server_path: 服务器目录路径
+            head: 当前的HEAD提交，指定时要求与保存时一致
+            ruleset_version: 当前的规则集版本，指定时要求与保存时一致
         
         Returns:
-            分析结果字典，如果不存在则返回None
+            分析结果字典，如果不存在或已过期则返回None
         """
         result_file = os.path.join(server_path, '.git', 'code_analysis_result.json')
         
@@ -836,6 +1116,12 @@ class CodeAnalyzer:
             if 'timestamp' not in data or 'results' not in data:
                 print(f"警告: {result_file} 中的数据格式无效")
                 return None
+
+            # 仓库有新的提交或规则集有改动时，已保存的结果不再有效
+            if head is not None and data.get('head') != head:
+                return None
+            if ruleset_version is not None and data.get('ruleset_version') != ruleset_version:
+                return None
                 
             # 检查数据是否过期（可选，例如超过7天）
             # timestamp = datetime.strptime(data['timestamp'], "%Y-%m-%d %H:%M:%S")
@@ -845,31 +1131,243 @@ class CodeAnalyzer:
             #     return None
                 
             print(f"从 {result_file} 加载了已存在的分析结果（{data['timestamp']}）")
-            return data['results']
+            return _findings_from_json(data['results'])
         except Exception as e:
             print(f"读取 {result_file} 时出错: {str(e)}")
             return None
 
+    def has_analysis_result(self, server_path, head=None, ruleset_version=None) -> bool:
+        """检查.git目录中是否有与 head、规则集版本一致的已保存分析结果，只读取元数据，不加载分析结果"""
+        result_file = os.path.join(server_path, '.git', 'code_analysis_result.json')
+        if not os.path.exists(result_file):
+            return False
+        try:
+            metadata = self._read_analysis_result_metadata(result_file)
+        except Exception:
+            return False
+        if 'timestamp' not in metadata:
+            return False
+        if head is not None and metadata.get('head') != head:
+            return False
+        return ruleset_version is None or metadata.get('ruleset_version') == ruleset_version
+
+    @staticmethod
+    def _read_analysis_result_metadata(result_file) -> Dict[str, Any]:
+        """
+        读取已保存结果文件中的元数据：save_analysis_result 把元数据写在 results 之前，读到 results 为止即可；
+        文件格式与此不同时解析整个文件。没有 results 时返回空字典
+        """
+        lines = []
+        with open(result_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.lstrip().startswith('"results"'):
+                    return json.loads(''.join(lines).rstrip().rstrip(',') + '}')
+                lines.append(line)
+                if len(lines) > 16:
+                    break
+        with open(result_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or 'results' not in data:
+            return {}
+        return {key: value for key, value in data.items() if key != 'results'}
+
+    def get_git_head(self, server_path):
+        """获取服务器仓库当前的HEAD提交，不是Git仓库时返回None"""
+        if not os.path.exists(os.path.join(server_path, '.git')):
+            return None
+        try:
+            result = subprocess.run(
+                ['git', '-C', server_path, 'rev-parse', 'HEAD'],
+                capture_output=True,
+                text=True
+            )
+        except Exception as e:
+            print(f"获取 {server_path} 的HEAD时出错: {str(e)}")
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+
+    def load_git_updates(self):
+        """读取 update_git_repos.py 记录的各仓库更新前后的HEAD"""
+        self.git_updates = {}
+        if not self.git_updates_path:
+            return
+        with open(self.git_updates_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('layout', 'language') != 'language':
+            # 记录中是 目录/项目 的路径，与 base_dir/语言/服务器 的服务器目录对应不上
+            print(f"警告: {self.git_updates_path} 是按 {data['layout']} 布局记录的，"
+                  f"请用 update_git_repos.py --layout language 重新生成，本次不做增量分析")
+            return
+        for repo in data.get('repos', []):
+            if repo.get('old_head') and repo.get('new_head') and repo['old_head'] != repo['new_head']:
+                self.git_updates[os.path.normpath(os.path.abspath(repo['path']))] = (repo['old_head'], repo['new_head'])
+        print(f"从 {self.git_updates_path} 读取了 {len(self.git_updates)} 个有新提交的仓库")
+
+    def get_changed_files(self, server_path, old_head, new_head) -> Optional[List[str]]:
+        """列出两个提交之间有变化的文件（相对路径，重命名按删除+新增处理），失败时返回None"""
+        try:
+            result = subprocess.run(
+                ['git', '-C', server_path, 'diff', '--name-only', '--no-renames', '-z', old_head, new_head],
+                capture_output=True
+            )
+        except Exception as e:
+            print(f"获取 {server_path} 的变更文件时出错: {str(e)}")
+            return None
+        if result.returncode != 0:
+            return None
+        return [os.fsdecode(path) for path in result.stdout.split(b'\0') if path]
+
+    def _has_git_update(self, server, head, ruleset_version) -> bool:
+        """仓库是否有从上次分析时的HEAD到当前HEAD的更新记录，且上次的结果仍然可用（可以做增量分析）"""
+        update = self.git_updates.get(os.path.normpath(os.path.abspath(server.path)))
+        return update is not None and update[1] == head and self.has_analysis_result(server.path, update[0], ruleset_version)
+
+    def _rescan_git_update(self, server, head, ruleset_version) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """
+        仓库从上次分析时的HEAD拉取到当前HEAD时，只重新分析 git diff 中有变化的文件，
+        与上次保存的结果拼接后返回；没有可用的更新记录或上次结果时返回None（需要完整分析）
+        """
+        update = self.git_updates.get(os.path.normpath(os.path.abspath(server.path)))
+        if update is None:
+            return None
+        old_head, new_head = update
+        if new_head != head:
+            return None
+        previous_results = self.load_analysis_result(server.path, old_head, ruleset_version)
+        if previous_results is None:
+            return None
+        changed_files = self.get_changed_files(server.path, old_head, new_head)
+        if changed_files is None:
+            return None
+
+        print(f"增量分析 {server.server}: {len(changed_files)} 个文件有变化 ({old_head[:8]}..{new_head[:8]})")
+        return self.rescan_changed_files(server.path, server.files, previous_results, changed_files, server.server)
+
+    def rescan_changed_files(self, server_path: str, files, previous_results: Dict[str, List[Dict[str, Any]]],
+                             changed_files: List[str], server_name: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        在服务器上次的分析结果中，删除有变化的文件的结果，重新分析其中仍然存在的文件并拼接回去
+
+        结果按文件在目录遍历中的顺序排列，与完整分析 scan_server 的结果一致
+        """
+        if files is None:
+            files = scan_server_files(server_path, self.excluded_dirs)
+        positions = {}  # 文件绝对路径 -> 在目录遍历中的位置（排除目录中的文件不在其中）
+        for position, file_entry in enumerate(files):
+            positions[os.path.abspath(os.path.normpath(os.path.join(server_path, file_entry.path)))] = position
+        changed = {os.path.abspath(os.path.normpath(os.path.join(server_path, path))) for path in changed_files}
+
+        language_results = {}
+        for language, findings in previous_results.items():
+            kept = [finding for finding in findings if finding.get('file') not in changed]
+            if kept:
+                language_results[language] = kept
+
+        generated_before = self.generated_stats.copy()
+        for file_path in sorted(changed & positions.keys(), key=positions.get):
+            language = self.get_language_by_extension(file_path)
+            if language not in SUPPORTED_LANGUAGES:
+                continue
+            print(f"\n分析 {language} 文件: {file_path}")
+            file_results = self.analyze_file(file_path, language)
+            if file_results:
+                print(f"发现 {len(file_results)} 个潜在问题")
+                for finding in file_results:
+                    finding["server"] = server_name
+                language_results.setdefault(language, []).extend(file_results)
+
+        # 记录本次重新分析的文件中识别出的生成文件
+        generated = self.generated_stats - generated_before
+        if generated:
+            self.generated_by_server[server_name] = generated
+        if self.findings_cache is not None:
+            self.findings_cache.commit()
+
+        # 恢复目录遍历顺序：语言按其第一个结果所在文件排序，同一文件内保持分析时的顺序
+        unknown_position = len(positions)
+        for findings in language_results.values():
+            findings.sort(key=lambda finding: positions.get(finding.get('file'), unknown_position))
+        return dict(sorted(
+            language_results.items(),
+            key=lambda item: positions.get(item[1][0].get('file'), unknown_position)
+        ))
+
+    def _get_server_ruleset_version(self) -> str:
+        """计算当前所有规则表和排除目录配置的整体版本，用于判断服务器的已保存结果是否有效"""
+        versions = [f"{language}:{self._get_ruleset_version(language)}" for language in SUPPORTED_LANGUAGES]
+        versions.append('excluded:' + ','.join(sorted(self.excluded_dirs)))
+        versions.append('generated:' + self.generated_policy)
+        return hashlib.sha1('\n'.join(versions).encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _folder_repo_key(server_name: str) -> Optional[str]:
+        """
+        从文件夹名提取用于匹配元数据的 user_repo 键
+        文件夹名格式通常为 user_repo 或 user_repo_counter，不含下划线的文件夹名无法匹配，返回None
+        """
+        user_repo_parts = server_name.split('_')
+        if len(user_repo_parts) < 2:
+            return None
+        # 处理可能的计数器后缀
+        if user_repo_parts[-1].isdigit():
+            return '_'.join(user_repo_parts[:-1])
+        return server_name
+
+    @staticmethod
+    def _repo_name_from_url(github_url: str, fallback: str) -> str:
+        """从原始URL提取仓库名称 (owner/repo)，没有有效的GitHub URL时使用文件夹名"""
+        if 'github.com/' not in github_url:
+            return fallback
+        repo_name = github_url.split('github.com/')[1]
+        if repo_name.endswith('.git'):
+            repo_name = repo_name[:-4]
+        return repo_name.rstrip('/')
+
+    @staticmethod
+    def _build_metadata_index(records: List[Dict[str, Any]], key_funcs) -> Dict[str, List[int]]:
+        """
+        为元数据记录建立 键 -> 记录下标列表 的索引（下标按记录顺序排列）
+
+        Args:
+            records: JSON或Excel中处理后的记录
+            key_funcs: 从记录中取出匹配键的函数列表，同一条记录可以有多个键
+        """
+        index = defaultdict(list)
+        for i, item in enumerate(records):
+            for key_func in key_funcs:
+                key = key_func(item)
+                if key and (not index[key] or index[key][-1] != i):
+                    index[key].append(i)
+        return dict(index)
+
+    def _add_repo_categories(self, server_name: str, repo_name: str, categories: List[str]):
+        """把服务器匹配到的类别追加到仓库的类别列表，同时记录是哪个服务器添加的"""
+        self.repo_categories[repo_name].extend(categories)
+        self.server_categories.setdefault(server_name, []).extend(categories)
+
     def analyze_all(self) -> Dict[str, List[Dict[str, Any]]]:
         """分析所有支持的语言的源码并获取Git仓库信息"""
         # 初始化结果字典，支持所有语言
-        self.results = {
-            'python': [],
-            'typescript': [],
-            'rust': [],
-            'go': [],
-            'java': [],
-            'c': [],
-            'cpp': [],
-            'csharp': [],
-            'ruby': [],
-            'php': [],
-            'swift': [],
-            'kotlin': []
-        }
+        self.results = {language: [] for language in SUPPORTED_LANGUAGES}
+        finding_counts = defaultdict(int)  # 语言 -> 问题数
+        self.read_stats.clear()
+        self.generated_stats.clear()
+        self.generated_by_server = {}
+        self.degraded_scans = []
+        self.blob_findings = {}
+        self.empty_blobs = {}
+        self.dedupe_stats.clear()
+        self.open_findings_cache()
+        if self.findings_jsonl:
+            self.findings_sink = FindingsSink(self.findings_jsonl)
+            print(f"分析结果将流式写入: {self.findings_jsonl}")
         
         # 用于跟踪已有分析结果的服务器
         servers_with_cached_results = set()
+        resumed_servers = set()  # 从检查点日志恢复的服务器
+        incremental_servers = set()  # 只重新分析了有变化的文件的服务器
         
         print(f"\n{'='*50}")
         if self.max_servers:
@@ -878,13 +1376,11 @@ class CodeAnalyzer:
             print(f"开始分析所有服务器...")
         print(f"{'='*50}")
         
-        # 确保使用绝对路径
-        base_dir = os.path.abspath(self.base_dir)
-        
         # 初始化映射关系
         self.server_to_repo_mapping = {}  # 服务器名称到仓库的映射
         self.repo_stars = {}  # 仓库名称 -> 星星数
         self.repo_categories = defaultdict(list)  # 仓库名称 -> 类别列表
+        self.server_categories = {}  # 服务器名称 -> 该服务器添加的类别列表
         
         # 从JSON或Excel加载仓库数据
         json_data = []  # 存储处理后的JSON数据
@@ -936,6 +1432,7 @@ class CodeAnalyzer:
                 traceback.print_exc()
         elif self.excel_path and os.path.exists(self.excel_path):
             try:
+                import pandas as pd  # 只在读取Excel时加载
                 df = pd.read_excel(self.excel_path)
                 print(f"\n从Excel加载仓库数据: {self.excel_path}")
                 print(f"Excel数据行数: {len(df)}")
@@ -984,222 +1481,196 @@ class CodeAnalyzer:
             # 第一次遍历：获取服务器目录并匹配元数据
             print("\n从服务器目录获取并匹配仓库信息...")
             
+            # 建立元数据索引（每种数据只建立一次），键为服务器名称和URL中的 owner_repo 部分
+            json_index = self._build_metadata_index(json_data, [
+                lambda item: item['server_name'],
+                lambda item: item['normalized_url'].replace('/', '_') if item['normalized_url'] else ''
+            ])
+            excel_index = self._build_metadata_index(excel_data, [
+                lambda item: item['normalized_url'].replace('/', '_') if item['normalized_url'] else ''
+            ])
+            unmatched_servers = []
+            ambiguous_servers = []
+            
             # 创建服务器路径映射
             server_paths = {}
+            # 待扫描的服务器目录清单记录，保持目录遍历顺序
+            scan_targets = []
             
-            # 遍历目录结构
-            for language_dir in os.listdir(base_dir):
-                language_path = os.path.join(base_dir, language_dir)
-                if not os.path.isdir(language_path) or language_dir in self.excluded_dirs:
-                    continue
+            # 遍历目录结构（或读取文件清单）
+            for server in self.get_server_inventory():
+                server_name = server.server
+                server_path = server.path
                 
-                for server_name in os.listdir(language_path):
-                    server_path = os.path.join(language_path, server_name)
-                    if not os.path.isdir(server_path) or server_name in self.excluded_dirs:
-                        continue
-                    
-                    # 检查是否达到服务器数量限制
-                    if self.max_servers and len(self.analyzed_servers) >= self.max_servers:
-                        print(f"\n已达到最大分析服务器数量 ({self.max_servers})")
-                        break
-                    
-                    # 添加到已分析服务器列表
-                    self.analyzed_servers.add(server_name)
-                    
-                    # 添加到服务器路径映射
-                    server_paths[server_name] = server_path
-                    
-                    # 尝试匹配元数据
-                    match_found = False
-                    
-                    # 先尝试在JSON数据中匹配
-                    if json_data:
-                        for item in json_data:
-                            # 从文件夹名提取用户和仓库名
-                            # 格式通常为 user_repo 或 user_repo_counter
-                            user_repo_parts = server_name.split('_')
-                            if len(user_repo_parts) >= 2:
-                                # 处理可能的计数器后缀
-                                if user_repo_parts[-1].isdigit():
-                                    user_repo = '_'.join(user_repo_parts[:-1])
-                                else:
-                                    user_repo = server_name
-                                
-                                # 匹配条件：文件夹名（去掉计数器）与仓库名匹配，或URL中的仓库部分匹配
-                                repo_in_url = item['normalized_url'].replace('/', '_') if item['normalized_url'] else ''
-                                if user_repo == item['server_name'] or user_repo == repo_in_url:
-                                    # 从原始URL提取仓库名称 (owner/repo)
-                                    if 'github.com' in item['github_url']:
-                                        repo_name = item['github_url'].split('github.com/')[1]
-                                        if repo_name.endswith('.git'):
-                                            repo_name = repo_name[:-4]
-                                        repo_name = repo_name.rstrip('/')
-                                    else:
-                                        # 如果没有有效的GitHub URL，使用文件夹名作为仓库名
-                                        repo_name = user_repo
-                                    
-                                    self.server_to_repo_mapping[server_name] = repo_name
-                                    
-                                    # 合并所有类别
-                                    all_categories = []
-                                    if isinstance(item['categories'], list):
-                                        all_categories.extend(item['categories'])
-                                    if isinstance(item['metadata_categories'], list):
-                                        all_categories.extend(item['metadata_categories'])
-                                    
-                                    for category in all_categories:
-                                        if category and isinstance(category, str):
-                                            self.repo_categories[repo_name].append(category)
-                                    
-                                    # 如果没有类别信息，设置为Unknown
-                                    if not all_categories:
-                                        self.repo_categories[repo_name].append('Unknown')
-                                    
-                                    match_found = True
-                                    print(f"  成功匹配! {server_name} -> {repo_name}")
-                                    break
-                    
-                    # 如果JSON匹配失败，尝试Excel数据
-                    if not match_found and excel_data:
-                        for item in excel_data:
-                            # 从文件夹名提取用户和仓库名
-                            user_repo_parts = server_name.split('_')
-                            if len(user_repo_parts) >= 2:
-                                # 处理可能的计数器后缀
-                                if user_repo_parts[-1].isdigit():
-                                    user_repo = '_'.join(user_repo_parts[:-1])
-                                else:
-                                    user_repo = server_name
-                                
-                                # 匹配条件：文件夹名（去掉计数器）与URL中的仓库部分匹配
-                                repo_in_url = item['normalized_url'].replace('/', '_') if item['normalized_url'] else ''
-                                if user_repo == repo_in_url:
-                                    # 从原始URL提取仓库名称 (owner/repo)
-                                    if 'github.com/' in item['github_url']:
-                                        repo_name = item['github_url'].split('github.com/')[1]
-                                        if repo_name.endswith('.git'):
-                                            repo_name = repo_name[:-4]
-                                        repo_name = repo_name.rstrip('/')
-                                    else:
-                                        # 如果没有有效的GitHub URL，使用文件夹名作为仓库名
-                                        repo_name = user_repo
-                                    
-                                    self.server_to_repo_mapping[server_name] = repo_name
-                                    self.repo_stars[repo_name] = item['stars']
-                                    self.repo_categories[repo_name].append(item['category'])
-                                    match_found = True
-                                    print(f"  成功匹配! {server_name} -> {repo_name} (星星: {item['stars']})")
-                                    break
-                    
-                    if not match_found:
-                        # 如果没有匹配到元数据，使用文件夹名作为仓库名
-                        user_repo_parts = server_name.split('_')
-                        if len(user_repo_parts) >= 2:
-                            # 处理可能的计数器后缀
-                            if user_repo_parts[-1].isdigit():
-                                repo_name = '_'.join(user_repo_parts[:-1])
-                            else:
-                                repo_name = server_name
-                            
-                            self.server_to_repo_mapping[server_name] = repo_name
-                            self.repo_categories[repo_name].append('Unknown')
-                            print(f"  未找到匹配元数据，使用文件夹名作为仓库名: {server_name} -> {repo_name}")
-            
+                # 检查是否达到服务器数量限制
+                if self.max_servers and len(self.analyzed_servers) >= self.max_servers:
+                    print(f"\n已达到最大分析服务器数量 ({self.max_servers})")
+                    break
+                
+                # 添加到已分析服务器列表
+                self.analyzed_servers.add(server_name)
+                
+                # 添加到服务器路径映射
+                server_paths[server_name] = server_path
+                scan_targets.append(server)
+                
+                # 通过索引匹配元数据，匹配规则与逐条比较时相同：取第一条匹配的记录
+                match_found = False
+                user_repo = self._folder_repo_key(server_name)
+                
+                # 先尝试在JSON数据中匹配（文件夹名去掉计数器后与服务器名称或URL中的仓库部分匹配）
+                if json_data and user_repo:
+                    candidates = json_index.get(user_repo)
+                    if candidates:
+                        item = json_data[candidates[0]]
+                        repo_name = self._repo_name_from_url(item['github_url'], user_repo)
+                        if len({self._repo_name_from_url(json_data[i]['github_url'], user_repo) for i in candidates}) > 1:
+                            ambiguous_servers.append(server_name)
+                        
+                        self.server_to_repo_mapping[server_name] = repo_name
+                        
+                        # 合并所有类别
+                        all_categories = []
+                        if isinstance(item['categories'], list):
+                            all_categories.extend(item['categories'])
+                        if isinstance(item['metadata_categories'], list):
+                            all_categories.extend(item['metadata_categories'])
+                        
+                        categories = [category for category in all_categories if category and isinstance(category, str)]
+                        
+                        # 如果没有类别信息，设置为Unknown
+                        if not all_categories:
+                            categories = ['Unknown']
+                        self._add_repo_categories(server_name, repo_name, categories)
+                        
+                        match_found = True
+                        print(f"  成功匹配! {server_name} -> {repo_name}")
+                
+                # 如果JSON匹配失败，尝试Excel数据（文件夹名去掉计数器后与URL中的仓库部分匹配）
+                if not match_found and excel_data and user_repo:
+                    candidates = excel_index.get(user_repo)
+                    if candidates:
+                        item = excel_data[candidates[0]]
+                        repo_name = self._repo_name_from_url(item['github_url'], user_repo)
+                        if len({self._repo_name_from_url(excel_data[i]['github_url'], user_repo) for i in candidates}) > 1:
+                            ambiguous_servers.append(server_name)
+                        
+                        self.server_to_repo_mapping[server_name] = repo_name
+                        self.repo_stars[repo_name] = item['stars']
+                        self._add_repo_categories(server_name, repo_name, [item['category']])
+                        match_found = True
+                        print(f"  成功匹配! {server_name} -> {repo_name} (星星: {item['stars']})")
+                
+                if not match_found:
+                    unmatched_servers.append(server_name)
+                    # 如果没有匹配到元数据，使用文件夹名作为仓库名
+                    if user_repo:
+                        repo_name = user_repo
+                        self.server_to_repo_mapping[server_name] = repo_name
+                        self._add_repo_categories(server_name, repo_name, ['Unknown'])
+                        print(f"  未找到匹配元数据，使用文件夹名作为仓库名: {server_name} -> {repo_name}")
+        
+            # 报告未匹配和匹配到多个不同仓库的服务器
+            if unmatched_servers:
+                print(f"\n{len(unmatched_servers)} 个服务器未找到匹配的元数据: {', '.join(unmatched_servers[:20])}"
+                      + (" ..." if len(unmatched_servers) > 20 else ""))
+            if ambiguous_servers:
+                print(f"\n{len(ambiguous_servers)} 个服务器匹配到多个不同的仓库（已使用第一条记录）: "
+                      f"{', '.join(ambiguous_servers[:20])}" + (" ..." if len(ambiguous_servers) > 20 else ""))
             # 输出匹配结果
             print(f"\n成功匹配了 {len(self.server_to_repo_mapping)}/{len(self.analyzed_servers)} 个服务器")
             
             # 打印星星数分布信息
-            star_ranges = [
-                (0, 10),
-                (11, 100),
-                (101, 500),
-                (501, 1000),
-                (1001, 10000),
-                (10001, 50000),
-                (50001, float('inf'))
-            ]
-            
-            range_counts = [0] * len(star_ranges)
-            for _, stars in self.repo_stars.items():
-                for i, (min_val, max_val) in enumerate(star_ranges):
-                    if min_val <= stars <= max_val:
-                        range_counts[i] += 1
-                        break
+            range_counts = count_star_ranges(list(self.repo_stars.values()), STAR_HISTOGRAM_EDGES)
+            range_lows = (0,) + tuple(edge + 1 for edge in STAR_HISTOGRAM_EDGES)
+            range_highs = STAR_HISTOGRAM_EDGES + ('+',)
             
             print("\n仓库星星数范围分布:")
-            for i, (min_val, max_val) in enumerate(star_ranges):
-                range_label = f"{min_val}-{max_val if max_val != float('inf') else '+'}"
-                print(f"  {range_label}: {range_counts[i]} 个仓库")
-            
-            # 每个服务器的分析结果 {服务器名称 -> {语言 -> 问题列表}}
-            server_results = {}
-            
-            # 第二次遍历：进行代码分析
-            for root, dirs, files in os.walk(base_dir):
-                # 从遍历列表中移除需要排除的目录
-                dirs[:] = [d for d in dirs if d not in self.excluded_dirs]
-                
-                for file in files:
-                    try:
-                        file_path = os.path.join(root, file)
-                        file_path = os.path.normpath(file_path)  # 标准化路径
-                        
-                        # 检查文件是否在排除目录中
-                        if any(excluded in file_path.split(os.sep) for excluded in self.excluded_dirs):
-                            continue
-                            
-                        # 获取服务器名称 - 基于目录结构解析
-                        path_parts = file_path.split(os.sep)
-                        
-                        # 查找服务器名称（假设目录结构是 base_dir/language/server_name/...）
-                        # 找到语言目录的索引
-                        try:
-                            # 查找base_dir在路径中的位置
-                            base_dir_parts = base_dir.split(os.sep)
-                            base_index = 0
-                            for i, part in enumerate(path_parts):
-                                if i < len(base_dir_parts) and part == base_dir_parts[i]:
-                                    base_index = i
-                                else:
-                                    break
-                            
-                            # 确保路径结构足够深
-                            if len(path_parts) > base_index + 2:
-                                server_name = path_parts[base_index + 2]  # 服务器名称
-                                # 如果服务器不在已分析列表中，则跳过
-                                if server_name not in self.analyzed_servers:
-                                    continue
-                                # 如果服务器已有缓存结果，则跳过
-                                if server_name in servers_with_cached_results:
-                                    continue
-                        except (ValueError, IndexError):
-                            # 如果无法解析路径，跳过该文件
-                            continue
-                            
-                        language = self.get_language_by_extension(file_path)
-                        
-                        # 只处理支持的语言
-                        if language in self.results:
-                            print(f"\n分析 {language} 文件: {file_path}")
-                            # 分析单个文件并将结果添加到对应语言的列表中
-                            file_results = self.analyze_file(file_path, language)
-                            if file_results:
-                                print(f"发现 {len(file_results)} 个潜在问题")
-                                self.results[language].extend(file_results)
-                                
-                                # 添加到服务器特定结果
-                                if server_name not in server_results:
-                                    server_results[server_name] = {lang: [] for lang in self.results}
-                                server_results[server_name][language].extend(file_results)
-                                
-                    except Exception as e:
-                        print(f"分析文件时出错: {str(e)}")
+            for i, (min_val, max_val) in enumerate(zip(range_lows, range_highs)):
+                print(f"  {min_val}-{max_val}: {range_counts[i]} 个仓库")
+            
+            # 服务器的HEAD和规则集都没有变化时，直接复用上次保存在.git目录中的分析结果
+            print("\n检查服务器的已保存分析结果...")
+            ruleset_version = self._get_server_ruleset_version()
+            journal_offsets = self._open_scan_journal(ruleset_version)
+            self._open_results_db()
+            self.load_git_updates()
+            # 只记录每个服务器结果的来源，结果在合并时才逐个加载或分析，写出后即释放，不同时保留所有服务器的结果
+            # 来源: journal 检查点日志, stored .git目录中已保存的结果, incremental 增量分析, scan 完整分析
+            scan_plan = []  # [(清单记录, HEAD, 结果来源)]
+            for server in scan_targets:
+                if server.server in journal_offsets:
+                    scan_plan.append((server, None, 'journal'))
+                    continue
+                head = self.get_git_head(server.path) if server.is_git else None
+                source = 'scan'
+                if head and not self.force_rescan:
+                    if self.has_analysis_result(server.path, head, ruleset_version):
+                        source = 'stored'
+                    elif self._has_git_update(server, head, ruleset_version):
+                        # 仓库只是拉取了新提交时，在上次的结果基础上只重新分析有变化的文件
+                        source = 'incremental'
+                scan_plan.append((server, head, source))
+
+            # 第二次遍历：按服务器目录进行代码分析（--workers > 1 时使用进程池并行）
+            scanned = self._scan_servers([server for server, _, source in scan_plan if source == 'scan'])
+            # 按服务器目录的遍历顺序合并结果，保证与串行运行的输出一致
+            for server, head, source in scan_plan:
+                server_name = server.server
+                server_path = server.path
+                language_results = None
+                if source == 'journal':
+                    # 检查点日志中已完成的服务器直接使用日志中的结果
+                    journal_record = self.scan_journal.read(journal_offsets[server_name])
+                    language_results = _findings_from_json(journal_record['results'])
+                    self._restore_journal_stats(server_name, journal_record)
+                    resumed_servers.add(server_name)
+                elif source == 'stored':
+                    language_results = self.load_analysis_result(server_path, head, ruleset_version)
+                    if language_results is not None:
+                        servers_with_cached_results.add(server_name)
+                elif source == 'incremental':
+                    language_results = self._rescan_git_update(server, head, ruleset_version)
+                    if language_results is not None:
+                        incremental_servers.add(server_name)
+                        self.save_analysis_result(server_path, language_results, head, ruleset_version)
+
+                if language_results is None:
+                    read_stats_before = self.read_stats.copy()
+                    degraded_before = len(self.degraded_scans)
+                    if source == 'scan':
+                        language_results = next(scanned)
+                    else:
+                        # 计划时有效的已保存结果在加载时已失效，直接在本进程中分析
+                        language_results = self.scan_server(server_path, server.files, server_name)
+                    # 保存分析结果到服务器的.git目录，供下次运行复用
+                    if head:
+                        self.save_analysis_result(server_path, language_results, head, ruleset_version)
+                    # 记录检查点，中途被终止后可以用 --resume 跳过该服务器
+                    if self.scan_journal is not None:
+                        self.scan_journal.append(server_name, language_results,
+                                                 dict(self.read_stats - read_stats_before),
+                                                 dict(self.generated_by_server.get(server_name, {})),
+                                                 self.degraded_scans[degraded_before:])
+
+                for language, file_results in language_results.items():
+                    if not file_results:
                         continue
-            
-            # 保存每个服务器的分析结果
-            print("\n保存分析结果...")
-            for server_name, results in server_results.items():
-                print(f"  保存服务器 {server_name} 的分析结果")
+                    finding_counts[language] += len(file_results)
+                    if self.findings_sink is None:
+                        self.results[language].extend(file_results)
+                        continue
+
+                    # 流式输出：服务器分析完成后立即写出，不在内存中保留结果
+                    self.findings_sink.write_server(
+                        server_name,
+                        self.server_languages.get(server_name, language),
+                        [self._build_api_call_info(finding) for finding in file_results]
+                    )
+
+                # 结果数据库：在一个事务中替换该服务器的全部行
+                if self.results_db is not None:
+                    self._save_server_to_db(server, language_results)
                 
         except Exception as e:
             print(f"遍历目录结构时出错: {str(e)}")
@@ -1210,6 +1681,12 @@ class CodeAnalyzer:
         print(f"分析摘要:")
         print(f"{'='*50}")
         print(f"已分析的服务器 ({len(self.analyzed_servers)}):")
+        print(f"  - 使用缓存结果: {len(servers_with_cached_results)} 个服务器")
+        if resumed_servers:
+            print(f"  - 从检查点日志恢复: {len(resumed_servers)} 个服务器")
+        if incremental_servers:
+            print(f"  - 增量分析（只分析有变化的文件）: {len(incremental_servers)} 个服务器")
+        print(f"  - 重新分析: {len(self.analyzed_servers) - len(servers_with_cached_results) - len(resumed_servers) - len(incremental_servers)} 个服务器")
         
         for server in sorted(self.analyzed_servers):
             repo = self.server_to_repo_mapping.get(server, "未知")
@@ -1219,14 +1696,202 @@ class CodeAnalyzer:
         print(f"\n各语言的问题统计:")
         total_issues = 0
         for language in self.results:
-            issue_count = len(self.results[language])
+            issue_count = finding_counts[language]
             total_issues += issue_count
             if issue_count > 0:
                 print(f"{language}: 发现 {issue_count} 个问题")
         print(f"\n问题总数: {total_issues}")
+        
+        # 文件读取结果：二进制文件和无法按UTF-8解码的文件不参与分析
+        print(f"\n文件读取统计:")
+        print(f"  - 文本文件: {self.read_stats[READ_TEXT]} 个")
+        print(f"  - mmap读取的大文件: {self.read_stats[READ_MMAP]} 个")
+        print(f"  - 跳过的二进制文件: {self.read_stats[READ_BINARY]} 个")
+        print(f"  - 无法按UTF-8解码的文件: {self.read_stats[READ_DECODE_ERROR]} 个")
+        
+        # 内容去重：镜像、fork等仓库中内容完全相同的文件只分析一次
+        total_bytes = self.dedupe_stats["unique_bytes"] + self.dedupe_stats["duplicate_bytes"]
+        duplicate_ratio = self.dedupe_stats["duplicate_bytes"] / total_bytes * 100 if total_bytes else 0.0
+        print(f"\n内容去重统计:")
+        print(f"  - 不同内容的文件: {self.dedupe_stats['unique_files']} 个 ({self.dedupe_stats['unique_bytes'] / 1024 / 1024:.1f} MB)")
+        print(f"  - 内容重复、直接复用结果的文件: {self.dedupe_stats['duplicate_files']} 个 "
+              f"({self.dedupe_stats['duplicate_bytes'] / 1024 / 1024:.1f} MB，占读取字节的 {duplicate_ratio:.1f}%)")
+        
+        # 生成文件和压缩文件（按服务器）
+        if self.generated_by_server:
+            print(f"\n生成文件和压缩文件 (处理策略: {self.generated_policy}, 共 {sum(self.generated_stats.values())} 个):")
+            for server_name, generated in sorted(self.generated_by_server.items()):
+                reasons = ', '.join(f"{reason} {count}" for reason, count in sorted(generated.items()))
+                print(f"  - {server_name}: {reasons}")
+        
+        # 降级扫描：超长行或超出时间预算的文件，函数名改用关键字匹配识别
+        if self.degraded_scans:
+            print(f"\n降级扫描的文件 ({len(self.degraded_scans)} 个，超长行阈值 {MAX_LINE_LENGTH} 字符，"
+                  f"时间预算 {FUNCTION_TIME_BUDGET} 秒):")
+            for record in self.degraded_scans[:20]:
+                print(f"  - {record['file']}: {', '.join(record['reasons'])} (超长行 {record['long_lines']} 行)")
+            if len(self.degraded_scans) > 20:
+                print(f"  ... 其余 {len(self.degraded_scans) - 20} 个文件见保存的降级扫描记录")
+        self.close_findings_cache()
+        if self.findings_sink is not None:
+            self.findings_sink.close()
+        if self.scan_journal is not None:
+            self.scan_journal.close()
+        if self.results_db is not None:
+            self.results_db.close()
+            print(f"\n分析结果已更新到结果数据库: {self.results_db_path}")
+            self.results_db = None
             
         return self.results
 
+    def _open_scan_journal(self, ruleset_version: str) -> Dict[str, int]:
+        """打开检查点日志，--resume 时返回日志中已完成的服务器 {服务器名称 -> 记录在日志中的偏移量}"""
+        if not self.journal_path:
+            return {}
+        self.scan_journal = ScanJournal(self.journal_path)
+        shard = list(self.shard) if self.shard is not None else None
+        journal_offsets = self.scan_journal.load(ruleset_version, shard) if self.resume else {}
+        self.scan_journal.open(ruleset_version, shard, resume=bool(journal_offsets))
+        if journal_offsets:
+            print(f"从检查点日志恢复 {len(journal_offsets)} 个已完成的服务器: {self.journal_path}")
+        else:
+            print(f"检查点日志: {self.journal_path}")
+        return journal_offsets
+
+    def _open_results_db(self):
+        """打开结果数据库，更新规则表和本次加载的仓库星星数"""
+        if not self.results_db_path:
+            return
+        self.results_db = ResultsDB(self.results_db_path)
+        for language in SUPPORTED_LANGUAGES:
+            self.results_db.save_rules(language, get_checker(language).rules, get_ruleset_version(language))
+        self.results_db.save_repo_metadata(self.repo_stars)
+
+    def _save_server_to_db(self, server, language_results: Dict[str, List[Dict[str, Any]]]):
+        """用本次的分析结果替换结果数据库中该服务器的全部行（没有问题的服务器只保留服务器记录和类别）"""
+        api_calls = []
+        for language, file_results in language_results.items():
+            for finding in file_results:
+                api_call_info = self._build_api_call_info(finding)
+                api_call_info["language"] = finding.get("language") or language
+                api_calls.append(api_call_info)
+        # 与保存的JSON结果一致：优先使用元数据中的项目主要语言，否则使用第一种有问题的文件语言
+        file_language = next((language for language in SUPPORTED_LANGUAGES if language_results.get(language)),
+                             server.language or "Unknown")
+        self.results_db.replace_server(server.server, self.server_languages.get(server.server, file_language),
+                                       self.server_to_repo_mapping.get(server.server),
+                                       self.server_categories.get(server.server, []), api_calls)
+
+    def _restore_journal_stats(self, server_name: str, record: Dict[str, Any]):
+        """把检查点日志中记录的文件读取统计、生成文件和降级扫描记录合并到本次运行"""
+        self.read_stats.update(record['read_stats'])
+        if record['generated']:
+            self.generated_stats.update(record['generated'])
+            self.generated_by_server[server_name] = Counter(record['generated'])
+        self.degraded_scans.extend(record['degraded_scans'])
+
+    def get_server_inventory(self):
+        """
+        获取所有服务器目录：指定了文件清单时直接读取清单，否则列出 base_dir 下的服务器目录
+        指定了分片时只返回属于当前分片的服务器
+
+        清单必须是为 base_dir 按相同的排除目录生成的（否则抛出ValueError），
+        生成清单之后文件列表有变化的服务器不使用清单中的文件列表，分析时重新遍历
+        """
+        if self.manifest_path:
+            print(f"从文件清单读取服务器目录: {self.manifest_path}")
+            servers = read_manifest(self.manifest_path, base_dir=self.base_dir, excluded_dirs=self.excluded_dirs,
+                                    layout='language')
+        else:
+            servers = list_server_dirs(self.base_dir, self.excluded_dirs)
+
+        self.server_positions = {}
+        for position, server in enumerate(servers):
+            self.server_positions.setdefault(server.server, position)
+
+        if self.shard is not None:
+            shard_index, shard_count = self.shard
+            total = len(servers)
+            servers = [server for server in servers if shard_of(server.server, shard_count) == shard_index]
+            print(f"分片 {shard_index}/{shard_count}: 分析 {len(servers)}/{total} 个服务器")
+
+        if self.manifest_path:
+            servers = [server._replace(files=None) if is_stale(server, self.verify_manifest) else server
+                       for server in servers]
+            stale_count = sum(1 for server in servers if server.files is None)
+            if stale_count:
+                print(f"{stale_count} 个服务器在生成清单之后有变化，重新遍历目录")
+        return servers
+
+    def scan_server(self, server_path: str, files=None, server_name: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """分析单个服务器目录下的所有源码文件，返回 {语言 -> 问题列表}
+
+        files 为文件清单中该服务器的文件列表，为None时遍历目录获取；
+        server_name 为服务器名称（写入每条结果的 server 字段），为None时使用目录名
+        """
+        if server_name is None:
+            server_name = os.path.basename(os.path.normpath(server_path))
+        if files is None:
+            # 遍历时已经跳过了需要排除的目录
+            files = scan_server_files(server_path, self.excluded_dirs)
+
+        server_results = {}
+        generated_before = self.generated_stats.copy()
+        for file_entry in files:
+            try:
+                file_path = os.path.join(server_path, file_entry.path)
+                file_path = os.path.normpath(file_path)  # 标准化路径
+
+                language = self.get_language_by_extension(file_path)
+
+                # 只处理支持的语言
+                if language in SUPPORTED_LANGUAGES:
+                    print(f"\n分析 {language} 文件: {file_path}")
+                    # 分析单个文件并将结果添加到对应语言的列表中
+                    file_results = self.analyze_file(file_path, language)
+                    if file_results:
+                        print(f"发现 {len(file_results)} 个潜在问题")
+                        for finding in file_results:
+                            finding["server"] = server_name
+                        server_results.setdefault(language, []).extend(file_results)
+
+            except Exception as e:
+                print(f"分析文件时出错: {str(e)}")
+                continue
+
+        # 记录该服务器中识别出的生成文件
+        generated = self.generated_stats - generated_before
+        if generated:
+            self.generated_by_server[server_name] = generated
+
+        if self.findings_cache is not None:
+            self.findings_cache.commit()
+        return server_results
+
+    def _scan_servers(self, servers: List[Any]):
+        """依次返回每个服务器目录（清单记录）的分析结果，顺序与 servers 一致"""
+        if self.workers <= 1 or len(servers) <= 1:
+            for server in servers:
+                yield self.scan_server(server.path, server.files, server.server)
+            return
+
+        print(f"\n使用 {self.workers} 个进程并行分析 {len(servers)} 个服务器...")
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_scan_worker,
+                                 initargs=(self.base_dir, self.excluded_dirs, self.cache_path,
+                                           self.generated_policy)) as executor:
+            # executor.map 按提交顺序返回结果
+            for server, (server_results, stats) in zip(servers, executor.map(_scan_server_in_worker, servers)):
+                self.read_stats.update(stats["read_stats"])
+                if stats["generated"]:
+                    self.generated_stats.update(stats["generated"])
+                    self.generated_by_server[server.server] = stats["generated"]
+                self.degraded_scans.extend(stats["degraded_scans"])
+                self.dedupe_stats.update(stats["dedupe"])
+                if self.findings_cache is not None:
+                    self.findings_cache.hits += stats["cache_hits"]
+                    self.findings_cache.misses += stats["cache_misses"]
+                yield server_results
+
     def normalize_github_url(self, url):
         """标准化GitHub URL以便进行一致比较"""
         if not url or not isinstance(url, str):
@@ -1302,94 +1967,54 @@ class CodeAnalyzer:
 
         # 初始化最终的结果字典，按服务器归类
         final_results = {}
+        # 服务器在结果中的排序键 [首次出现的语言序号, 在完整服务器列表中的位置]，合并分片结果时据此恢复单机运行的顺序
+        server_order = {}
         
-        # 处理每种语言的分析结果
-        for language, findings in self.results.items():
-            # 只处理有结果的语言
-            if not findings:
-                continue
-                
-            # 处理该语言下的每个发现
+        # 处理每种语言的分析结果：每条结果在分析时已记录所属服务器和规则信息，这里只需按服务器归类
+        for language_rank, (language, findings) in enumerate(self.results.items()):
             for finding in findings:
-                # 标准化路径，确保使用正确的路径分隔符
-                file_path = finding.get('file', '')
-                normalized_path = os.path.normpath(file_path)
-                
-                # 从路径中提取服务器名称
-                path_parts = normalized_path.replace('\\', '/').split('/')
-                server_name = None
-                
-                # 查找服务器名称（假设目录结构是 base_dir/language/server_name/...）
-                # 找到base_dir在路径中的位置
-                base_dir = os.path.abspath(self.base_dir)
-                base_dir_parts = base_dir.replace('\\', '/').split('/')
-                base_index = -1
-                
-                # 查找base_dir在路径中的位置
-                for i in range(len(path_parts) - len(base_dir_parts) + 1):
-                    if path_parts[i:i+len(base_dir_parts)] == base_dir_parts:
-                        base_index = i + len(base_dir_parts) - 1
-                        break
-                
-                # 修改：根据实际目录结构提取服务器名称，跳过语言层级
-                if base_index != -1 and base_index + 1 < len(path_parts):
-                    # 从路径提取服务器名称（直接在base_dir下一级）
-                    server_name_from_path = path_parts[base_index + 1]
-                    
-                    # 初始化服务器结果 - 使用元数据中的项目主要语言
-                    if server_name_from_path not in final_results:
-                        # 优先使用元数据中的语言，如果没有则使用文件语言作为备选
-                        project_language = self.server_languages.get(server_name_from_path, language)
-                        final_results[server_name_from_path] = {
-                            "language": project_language,  # 使用元数据中的项目主要语言
-                            "api_calls": [],
-                            "threat_types": {},
-                            "resource_types": {}  # 新增资源类型统计
-                        }
-                    
-                    # 更新server_name变量以便后续使用
-                    server_name = server_name_from_path
-                    
-                # 获取API名称和威胁类型
-                api_name = finding.get('api_name', '')
-                
-                # 获取API威胁类型和资源类型
-                lang_checker = self.get_language_api_checker(language)
-                if lang_checker and api_name:
-                    threat_type = lang_checker.get_api_threat_type(api_name)
-                    resource_type = lang_checker._dangerous_apis.get(api_name, {}).get('resource_type', 'UNKNOWN')
-                else:
-                    threat_type = finding.get('threat_type', 'UNKNOWN')
-                    resource_type = finding.get('resource_type', 'UNKNOWN')
-                
-                if server_name:
-                    # 构建完整的API调用信息
-                    api_call_info = {
-                        "path": normalized_path,
-                        "line": finding.get('line', 0),
-                        "column": finding.get('column', 0),
-                        "api_call": api_name,
-                        "function": finding.get('function', ''),
-                        "description": finding.get('description', ''),
-                        "threat_type": threat_type,
-                        "resource_type": resource_type  # 新增资源类型字段
+                server_name = finding.get('server')
+                if not server_name:
+                    continue
+
+                server_data = final_results.get(server_name)
+                if server_data is None:
+                    # 初始化服务器结果 - 优先使用元数据中的项目主要语言，如果没有则使用文件语言作为备选
+                    server_data = final_results[server_name] = {
+                        "language": self.server_languages.get(server_name, language),
+                        "api_calls": [],
+                        "threat_types": {},
+                        "resource_types": {}  # 新增资源类型统计
                     }
-                    
-                    # 添加到API调用列表
-                    final_results[server_name]["api_calls"].append(api_call_info)
-                    
-                    # 更新威胁类型统计
-                    if threat_type not in final_results[server_name]["threat_types"]:
-                        final_results[server_name]["threat_types"][threat_type] = 0
-                    final_results[server_name]["threat_types"][threat_type] += 1
-                    
-                    # 更新资源类型统计
-                    if resource_type not in final_results[server_name]["resource_types"]:
-                        final_results[server_name]["resource_types"][resource_type] = 0
-                    final_results[server_name]["resource_types"][resource_type] += 1
+                    server_order[server_name] = [language_rank, self.server_positions.get(server_name, -1)]
+
+                # 构建完整的API调用信息
+                api_call_info = self._build_api_call_info(finding)
+                server_data["api_calls"].append(api_call_info)
+
+                # 更新威胁类型和资源类型统计
+                threat_types = server_data["threat_types"]
+                threat_types[api_call_info["threat_type"]] = threat_types.get(api_call_info["threat_type"], 0) + 1
+                resource_types = server_data["resource_types"]
+                resource_types[api_call_info["resource_type"]] = resource_types.get(api_call_info["resource_type"], 0) + 1
+        
+        # 流式输出时，API调用已在分析过程中逐个服务器写入JSON Lines文件，这里只保存汇总统计
+        if self.findings_sink is not None:
+            final_results.update(self.findings_sink.summaries)
+            for server_name in self.findings_sink.summaries:
+                server_order.setdefault(server_name, [len(self.results), self.server_positions.get(server_name, -1)])
+            print(f"API调用明细已保存到: {self.findings_sink.output_path}"
+                  f"（结果文件中的服务器只有 api_calls_file 和 api_call_count，没有 api_calls 列表）")
         
         # 生成带时间戳的输出文件名
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if self.shard is not None:
+            self._save_shard(final_results, server_order, output_dir, timestamp)
+        return self._write_results(final_results, self.degraded_scans, output_dir, timestamp, generate_security_table)
+
+    def _write_results(self, final_results: Dict[str, Any], degraded_scans: List[Dict[str, Any]], output_dir: str,
+                       timestamp: str, generate_security_table: bool = True) -> str:
+        """保存按服务器归类的结果和降级扫描记录，打印摘要并可选地生成安全统计表，返回结果文件路径"""
         output_file = os.path.join(output_dir, f'analysis_result_{timestamp}.json')
         
         # 写入JSON文件
@@ -1398,6 +2023,19 @@ class CodeAnalyzer:
         
         print(f"分析结果已保存到: {output_file}")
         
+        # 按列另存一份，威胁统计和安全统计表可以只加载需要的列
+        if self.columnar_format:
+            columns_file = write_columns(final_results, os.path.splitext(output_file)[0], self.columnar_format)
+            if columns_file:
+                print(f"按列保存的分析结果已保存到: {columns_file}")
+        
+        # 保存降级扫描记录
+        if degraded_scans:
+            degraded_file = os.path.join(output_dir, f'degraded_scans_{timestamp}.json')
+            with open(degraded_file, 'w', encoding='utf-8') as f:
+                json.dump(degraded_scans, f, ensure_ascii=False, indent=2)
+            print(f"降级扫描记录已保存到: {degraded_file}")
+        
         # 打印威胁统计摘要
         print("\n分析结果摘要:")
         for server, data in final_results.items():
@@ -1421,48 +2059,77 @@ class CodeAnalyzer:
             for resource_type, count in data["resource_types"].items():
                 print(f"  - {resource_type}: {count}个API调用")
         
+        # 预聚合的威胁统计立方体，之后的各种交叉统计直接切片，不必重新加载结果（需要numpy）
+        cube = self.build_threat_cube(final_results)
+        if cube is not None:
+            cube_file = cube.save(os.path.join(output_dir, f'threat_cube_{timestamp}.cube.npz'))
+            print(f"\n威胁统计立方体已保存到: {cube_file}")
+        
         # 如果需要，生成安全统计表
         if generate_security_table:
-            table_file = self.generate_security_table(final_results, output_dir, timestamp)
+            table_file = self.generate_security_table(final_results, output_dir, timestamp, cube)
             print(f"\n安全统计表已保存到: {table_file}")
         
         return output_file
 
+    def _save_shard(self, final_results: Dict[str, Any], server_order: Dict[str, List[int]], output_dir: str,
+                    timestamp: str) -> str:
+        """
+        保存分片的结果文件，供 merge 子命令合并
+
+        除按服务器归类的结果外，还保存服务器的排序键、降级扫描记录，以及生成安全统计表所需的
+        服务器 -> 仓库映射、仓库星星数（只保存本分片服务器涉及的仓库）和本分片每个服务器添加的类别
+        （包括没有分析结果的服务器，合并时按服务器位置拼接，与单机运行时按服务器逐个追加的类别列表相同）
+        """
+        shard_index, shard_count = self.shard
+        repos = {self.server_to_repo_mapping[server] for server in final_results if server in self.server_to_repo_mapping}
+        shard_data = {
+            'shard': [shard_index, shard_count],
+            'version': ANALYZER_VERSION,
+            'ruleset_version': self._get_server_ruleset_version(),
+            'server_order': server_order,
+            'results': final_results,
+            'degraded_scans': self.degraded_scans,
+            'server_to_repo_mapping': {
+                server: repo for server, repo in self.server_to_repo_mapping.items() if server in final_results
+            },
+            'repo_stars': {repo: self.repo_stars[repo] for repo in repos if repo in self.repo_stars},
+            'server_categories': {
+                server: [self.server_positions.get(server, -1), self.server_to_repo_mapping[server], categories]
+                for server, categories in self.server_categories.items()
+            },
+        }
+        shard_file = os.path.join(output_dir, f'analysis_shard_{shard_index}-of-{shard_count}_{timestamp}.json')
+        with open(shard_file, 'w', encoding='utf-8') as f:
+            json.dump(shard_data, f, ensure_ascii=False, indent=2)
+        print(f"分片结果已保存到: {shard_file}")
+        return shard_file
+
+    def _build_api_call_info(self, finding: Dict[str, Any]) -> Dict[str, Any]:
+        """把单个分析结果转换为输出文件中的API调用信息（威胁类型和资源类型在分析时已写入结果）"""
+        api_name = finding.get('api_name', '')
+        threat_type = finding.get('threat_type', 'UNKNOWN')
+        resource_type = finding.get('resource_type', 'UNKNOWN')
+        
+        return {
+            "path": os.path.normpath(finding.get('file', '')),
+            "line": finding.get('line', 0),
+            "column": finding.get('column', 0),
+            "api_call": api_name,
+            "function": finding.get('function', ''),
+            "description": finding.get('description', ''),
+            "threat_type": threat_type,
+            "resource_type": resource_type,  # 新增资源类型字段
+            **({"generated": finding["generated"]} if finding.get("generated") else {})
+        }
+
     def get_language_api_checker(self, language: str):
         """
-        根据语言获取对应的API检查器
+        根据语言获取对应的API检查器（来自进程内注册表），不支持的语言返回None
         """
-        from dangerous_apis import (
-            PythonAPIChecker, TypeScriptAPIChecker, JavaAPIChecker, 
-            CppAPIChecker, RustAPIChecker, GoAPIChecker, 
-            CSharpAPIChecker, PHPAPIChecker, RubyAPIChecker,
-            SwiftAPIChecker, KotlinAPIChecker
-        )
-        
-        language = language.lower()
-        if language == 'python':
-            return PythonAPIChecker()
-        elif language in ('javascript', 'typescript', 'js', 'ts'):
-            return TypeScriptAPIChecker()
-        elif language == 'java':
-            return JavaAPIChecker()
-        elif language in ('c', 'cpp', 'c++'):
-            return CppAPIChecker()
-        elif language == 'rust':
-            return RustAPIChecker()
-        elif language == 'go':
-            return GoAPIChecker()
-        elif language in ('csharp', 'c#'):
-            return CSharpAPIChecker()
-        elif language == 'php':
-            return PHPAPIChecker()
-        elif language == 'ruby':
-            return RubyAPIChecker()
-        elif language == 'swift':
-            return SwiftAPIChecker()
-        elif language == 'kotlin':
-            return KotlinAPIChecker()
-        else:
+        try:
+            return get_checker(language)
+        except ValueError:
             return None
 
     def load_json_data(self):
@@ -1544,6 +2211,7 @@ class CodeAnalyzer:
             
         try:
             print(f"\n加载Excel数据: {self.excel_path}")
+            import pandas as pd  # 只在读取Excel时加载
             df = pd.read_excel(self.excel_path)
             
             # 确保必要的列存在
@@ -1630,6 +2298,10 @@ class CodeAnalyzer:
             return
         
         try:
+            # 只在获取星星数时加载pandas和requests
+            import pandas as pd
+            import requests
+
             # 读取Excel文件
             df = pd.read_excel(self.excel_path)
             
@@ -1786,7 +2458,7 @@ class CodeAnalyzer:
         return None
 
 
-    def analyze_all_with_categories(self):
+    def analyze_all_with_categories(self, output_dir: str = './output'):
         """分析所有支持的语言的源码并按照类别进行统计"""
         print("\n开始完整分析流程...")
         
@@ -1811,119 +2483,85 @@ class CodeAnalyzer:
         self.analyze_all()
         
         # 保存结果并生成安全统计表
-        return self.save_results(generate_security_table=True)
+        return self.save_results(output_dir=output_dir, generate_security_table=True)
 
 
-    def generate_security_table(self, results, output_dir, timestamp):
+    def generate_security_table(self, results, output_dir, timestamp, cube=_CUBE_NOT_BUILT):
         """生成安全统计表并保存到文件"""
         print("\n生成安全统计表...")
         print(f"当前日期和时间 (UTC): {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"当前用户登录: {getattr(self, 'user_login', '1528344561')}")
         
-        # 初始化用于存储统计数据的结构
-        category_stats = defaultdict(lambda: {
-            # 'secure': 0,
-            'total': 0,
-            'resource_types': defaultdict(int),
-            'server_count': 0
-        })
-        
-        # 按下载范围(星星数)的统计
-        star_range_stats = defaultdict(lambda: {
-            # 'secure': 0,
-            'total': 0,
-            'resource_types': defaultdict(int),
-            'server_count': 0
-        })
+        # 按 (类别, 星星数范围, 语言, 威胁类型, 资源类型) 预聚合的服务器数，表格中的各项统计都是它的切片
+        if cube is _CUBE_NOT_BUILT:
+            cube = self.build_threat_cube(results)
+        if cube is not None:
+            category_stats, star_range_stats, all_resource_types, skipped_servers = cube.security_table_stats(
+                get_star_range_labels(self.star_edges))
+        else:
+            # 未安装numpy时逐个服务器累加
+            category_stats, star_range_stats, all_resource_types, skipped_servers = self._security_table_stats(results)
         
-        # 定义星星数范围
-        star_ranges = [
-            (0, 10),
-            (11, 100),
-            (101, 1000),
-            (1001, 10000),
-            (10001, 50000),
-            (50001, float('inf'))
-        ]
-        
-        # 定义以便在表格中显示的范围标签
-        star_range_labels = [
-            '0-10',
-            '11-100',
-            '101-1000',
-            '1001-10000',
-            '10001-50000',
-            '50000+'
-        ]
-        
-        # 获取所有唯一的资源类型
+        print(f"\n跳过了 {skipped_servers} 个没有在Excel中找到星星数的服务器")
+        return self._write_security_table(category_stats, star_range_stats, all_resource_types, output_dir, timestamp)
+
+    def build_threat_cube(self, results):
+        """根据按服务器归类的结果和仓库元数据构建威胁统计立方体，未安装numpy时返回None"""
+        try:
+            from threat_cube import ThreatCube  # 依赖numpy，只在生成统计时加载
+        except ImportError:
+            print("警告: 未安装numpy包，不生成威胁统计立方体")
+            return None
+        return ThreatCube.build(results, self.server_to_repo_mapping, self.repo_stars, self.repo_categories,
+                                self.star_edges, get_star_range_labels(self.star_edges), "未分类")
+
+    def _security_table_stats(self, results):
+        """
+        逐个服务器累加安全统计表的数据（不依赖numpy），结果与 ThreatCube.security_table_stats 相同
+
+        Returns:
+            tuple: (类别 -> 统计, 星星数范围 -> 统计, 所有资源类型, 跳过的服务器数)
+        """
+        def empty_stats():
+            return {'total': 0, 'resource_types': defaultdict(int), 'server_count': 0}
+
+        star_range_labels = get_star_range_labels(self.star_edges)
+        category_stats = defaultdict(empty_stats)
+        star_range_stats = {label: empty_stats() for label in star_range_labels}
         all_resource_types = set()
-        
-        # 预处理: 找出所有的资源类型
-        for server_name, server_data in results.items():
-            for resource_type in server_data.get("resource_types", {}):
-                all_resource_types.add(resource_type)
-        
-        # 处理每个服务器的结果
         skipped_servers = 0
         for server_name, server_data in results.items():
-            # 查找对应的仓库
+            resource_types = server_data.get("resource_types", {})
+            all_resource_types.update(resource_types)
+
+            # 没有对应仓库或仓库不在Excel中的服务器不计入统计
             repo_name = self.server_to_repo_mapping.get(server_name)
-            if not repo_name:
-                print(f"警告: 服务器 '{server_name}' 没有找到对应的仓库，跳过")
-                skipped_servers += 1
-                continue
-                
-            # 检查仓库是否在Excel中有星星数记录
-            if repo_name not in self.repo_stars:
-                print(f"仓库 '{repo_name}' 不在Excel中，跳过")
+            if not repo_name or repo_name not in self.repo_stars:
                 skipped_servers += 1
                 continue
-                
-            # 获取仓库的星星数量
-            star_count = self.repo_stars[repo_name]
-            
-            # 找到适合的星星数范围
-            star_range_idx = 0
-            for i, (min_stars, max_stars) in enumerate(star_ranges):
-                if min_stars <= star_count <= max_stars:
-                    star_range_idx = i
-                    break
-            
-            star_range = star_range_labels[star_range_idx]
-            print(f"服务器 {server_name} -> 仓库 {repo_name} -> 星星数 {star_count} -> 范围 {star_range}")
-            
-            # 获取服务器的类别（如果有的话）
-            categories = self.repo_categories.get(repo_name, ["未分类"])
-            
-            # 检查这个服务器是否有危险的API调用
-            api_calls = server_data.get("api_calls", [])
-            has_insecure_calls = len(api_calls) > 0
-            
-            # 更新每个类别的统计信息
-            for category in categories:
-                category_stats[category]['total'] += 1
-                category_stats[category]['server_count'] += 1
-                
-                # if not has_insecure_calls:
-                #     category_stats[category]['secure'] += 1
-                
-                # 统计每种资源类型的数量（不管是否安全）
-                for resource_type, count in server_data.get("resource_types", {}).items():
-                    category_stats[category]['resource_types'][resource_type] += 1
-            
-            # 更新星星数范围的统计信息
-            star_range_stats[star_range]['total'] += 1
-            star_range_stats[star_range]['server_count'] += 1
-            
-            # if not has_insecure_calls:
-            #     star_range_stats[star_range]['secure'] += 1
-            
-            # 统计每种资源类型的数量
-            for resource_type, count in server_data.get("resource_types", {}).items():
-                star_range_stats[star_range]['resource_types'][resource_type] += 1
-        
-        print(f"\n跳过了 {skipped_servers} 个没有在Excel中找到星星数的服务器")
+
+            # 类别列表中重复的类别按出现次数计数
+            star_range = star_range_labels[star_bucket(self.repo_stars[repo_name], self.star_edges)]
+            for stats in [category_stats[category] for category in self.repo_categories.get(repo_name, ["未分类"])] \
+                    + [star_range_stats[star_range]]:
+                stats['total'] += 1
+                stats['server_count'] += 1
+                for resource_type in resource_types:
+                    stats['resource_types'][resource_type] += 1
+        return category_stats, star_range_stats, all_resource_types, skipped_servers
+
+    def generate_security_table_from_db(self, results_db: ResultsDB, output_dir, timestamp):
+        """用SQL聚合查询从结果数据库生成安全统计表并保存到文件"""
+        print("\n从结果数据库生成安全统计表...")
+        print(f"当前日期和时间 (UTC): {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}")
+        category_stats, star_range_stats, all_resource_types, skipped_servers = results_db.security_table_stats(
+            self.star_edges, get_star_range_labels(self.star_edges), "未分类")
+        print(f"\n跳过了 {skipped_servers} 个没有找到对应仓库或星星数的服务器")
+        return self._write_security_table(category_stats, star_range_stats, all_resource_types, output_dir, timestamp)
+
+    def _write_security_table(self, category_stats, star_range_stats, all_resource_types, output_dir, timestamp):
+        """把按类别和星星数范围的统计写成Markdown表格，返回表格文件路径"""
+        star_range_labels = get_star_range_labels(self.star_edges)
         
         # 打印星星范围统计的结果
         print("\n星星范围统计结果:")
@@ -1991,26 +2629,219 @@ class CodeAnalyzer:
         print(f"安全统计表已保存到: {table_file}")
         return table_file
 
+# 工作进程内复用的分析器实例
+_worker_analyzer = None
+
+def _init_scan_worker(base_dir, excluded_dirs, cache_path, generated_policy):
+    """进程池初始化：每个工作进程创建一个分析器实例"""
+    global _worker_analyzer
+    _worker_analyzer = CodeAnalyzer(base_dir=base_dir, cache_path=cache_path, generated_policy=generated_policy)
+    _worker_analyzer.excluded_dirs = set(excluded_dirs)
+    if cache_path:
+        _worker_analyzer.findings_cache = FindingsCache(cache_path)
+
+def _scan_server_in_worker(server):
+    """
+    在工作进程中分析单个服务器目录，返回 (分析结果, 本次的统计信息)
+    统计信息包括缓存命中/未命中数、文件读取结果、生成文件、降级扫描记录和内容去重统计，由主进程合并
+    （内容去重只在同一个工作进程分析的文件之间进行）
+    """
+    cache = _worker_analyzer.findings_cache
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    _worker_analyzer.read_stats = Counter()
+    _worker_analyzer.generated_stats = Counter()
+    _worker_analyzer.degraded_scans = []
+    _worker_analyzer.dedupe_stats = Counter()
+    server_results = _worker_analyzer.scan_server(server.path, server.files, server.server)
+    stats = {
+        "cache_hits": cache.hits - hits if cache is not None else 0,
+        "cache_misses": cache.misses - misses if cache is not None else 0,
+        "read_stats": _worker_analyzer.read_stats,
+        "generated": _worker_analyzer.generated_stats,
+        "degraded_scans": _worker_analyzer.degraded_scans,
+        "dedupe": _worker_analyzer.dedupe_stats
+    }
+    return server_results, stats
+
+def merge_shard_results(shard_paths: List[str], output_dir: str = './output', generate_security_table: bool = True,
+                        columnar_format: Optional[str] = None, star_edges: Optional[Tuple[int, ...]] = None) -> str:
+    """
+    合并 --shard 运行生成的分片结果文件，输出与单机运行相同的结果文件和安全统计表，返回结果文件路径
+
+    要求所有分片的分片总数、规则集版本一致，且每个分片恰好出现一次
+    """
+    shards = {}
+    for shard_path in shard_paths:
+        with open(shard_path, 'r', encoding='utf-8') as f:
+            shard_data = json.load(f)
+        shard_index, shard_count = shard_data['shard']
+        if shard_index in shards:
+            raise ValueError(f"分片 {shard_index}/{shard_count} 重复: {shard_path}")
+        shards[shard_index] = shard_data
+
+    first = next(iter(shards.values()))
+    shard_count = first['shard'][1]
+    for shard_data in shards.values():
+        if shard_data['shard'][1] != shard_count:
+            raise ValueError(f"分片总数不一致: {shard_data['shard'][1]} != {shard_count}")
+        if shard_data['ruleset_version'] != first['ruleset_version']:
+            raise ValueError(f"分片 {shard_data['shard'][0]} 的规则集版本不一致，需要用相同的规则重新分析")
+    missing = sorted(set(range(shard_count)) - set(shards))
+    if missing:
+        raise ValueError(f"缺少分片: {', '.join(f'{index}/{shard_count}' for index in missing)}")
+
+    # 恢复单机运行时的服务器顺序，分析器中只填充生成摘要和安全统计表所需的映射
+    analyzer = CodeAnalyzer(columnar_format=columnar_format, star_edges=star_edges)
+    server_order = {}
+    server_results = {}
+    server_categories = {}
+    degraded_scans = []
+    for shard_index in sorted(shards):
+        shard_data = shards[shard_index]
+        server_order.update(shard_data['server_order'])
+        server_results.update(shard_data['results'])
+        degraded_scans.extend(shard_data['degraded_scans'])
+        analyzer.server_to_repo_mapping.update(shard_data['server_to_repo_mapping'])
+        analyzer.repo_stars.update(shard_data['repo_stars'])
+        server_categories.update(shard_data['server_categories'])
+    # 各仓库的类别列表由所有分片的服务器按位置拼接而成（同一仓库的服务器可能分布在不同分片中）
+    for position, repo_name, categories in sorted(server_categories.values(), key=lambda entry: entry[0]):
+        analyzer.repo_categories[repo_name].extend(categories)
+    final_results = {
+        server: server_results[server]
+        for server in sorted(server_results, key=lambda server: tuple(server_order[server]))
+    }
+    print(f"合并 {shard_count} 个分片，共 {len(final_results)} 个服务器")
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return analyzer._write_results(final_results, degraded_scans, output_dir, timestamp, generate_security_table)
+
+def merge_main(argv: List[str]):
+    """merge 子命令：合并各分片的结果文件"""
+    parser = argparse.ArgumentParser(prog='analyzer.py merge', description='合并 --shard 运行生成的分片结果文件')
+    parser.add_argument('shard_files', nargs='+', help='各分片的 analysis_shard_*.json 文件')
+    parser.add_argument('--output-dir', type=str, default='./output', help='输出目录 (默认: ./output)')
+    parser.add_argument('--no-security-table', action='store_true', help='不生成安全统计表')
+    parser.add_argument('--columnar', choices=COLUMNAR_FORMATS, help='同时按列保存合并后的结果 (默认: 不保存)')
+    parser.add_argument('--star-edges', type=parse_star_edges, help=STAR_EDGES_HELP)
+    args = parser.parse_args(argv)
+
+    try:
+        merge_shard_results(args.shard_files, args.output_dir, not args.no_security_table, args.columnar,
+                            args.star_edges)
+    except ValueError as e:
+        print(f"错误: {str(e)}")
+        sys.exit(1)
+
+def table_main(argv: List[str]):
+    """
+    table 子命令：从按列保存的分析结果生成安全统计表，只加载服务器和资源类型两列；
+    也可以直接对 --db 的结果数据库做SQL聚合查询（仓库元数据已保存在数据库中）
+    """
+    parser = argparse.ArgumentParser(prog='analyzer.py table',
+                                     description='从按列保存的分析结果 (.parquet / .npz) 或结果数据库 (.sqlite) 生成安全统计表')
+    parser.add_argument('columns_file', help='--columnar 保存的 analysis_result_*.parquet / .npz 文件，或 --db 的结果数据库')
+    parser.add_argument('--json', type=str, help='JSON文件路径，包含仓库的类别信息 (merged_servers.json)')
+    parser.add_argument('--excel', type=str, help='Excel文件路径，包含仓库的类别信息')
+    parser.add_argument('--output-dir', type=str, default='./output', help='输出目录 (默认: ./output)')
+    parser.add_argument('--star-edges', type=parse_star_edges, help=STAR_EDGES_HELP)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if args.columns_file.endswith(RESULTS_DB_SUFFIXES):
+        results_db = ResultsDB(args.columns_file)
+        try:
+            CodeAnalyzer(star_edges=args.star_edges).generate_security_table_from_db(results_db, args.output_dir, timestamp)
+        finally:
+            results_db.close()
+        return
+
+    analyzer = CodeAnalyzer(excel_path=args.excel, json_path=args.json, star_edges=args.star_edges)
+    if args.json:
+        loaded = analyzer.load_json_data()
+    elif args.excel:
+        loaded = analyzer.load_excel_data()
+        if loaded:
+            analyzer.fetch_github_stars()
+    else:
+        print("错误: 需要用 --json 或 --excel 指定仓库的类别信息")
+        sys.exit(1)
+    if not loaded:
+        print("加载仓库数据失败，无法生成安全统计表")
+        sys.exit(1)
+
+    results = summarize_servers(args.columns_file, ('resource_types',))
+    analyzer.generate_security_table(results, args.output_dir, timestamp)
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'merge':
+        merge_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'table':
+        table_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(description='分析MCP服务器中的危险API使用')
     parser.add_argument('--max-servers', type=int, help='最多分析的服务器数量 (默认: 不限制)')
     parser.add_argument('--language', type=str, help='仅分析指定语言的文件')
     parser.add_argument('--excel', type=str, help='Excel文件路径，包含仓库的类别信息')
     parser.add_argument('--json', type=str, help='JSON文件路径，包含仓库的类别信息 (merged_servers.json)')
     parser.add_argument('--output-dir', type=str, default='./output', help='输出目录 (默认: ./output)')
+    parser.add_argument('--workers', type=int, default=1, help='按服务器目录并行分析的进程数 (默认: 1, 即串行)')
+    parser.add_argument('--findings-cache', type=str, help='单文件分析结果缓存的SQLite文件路径 (默认: 不使用缓存)')
+    parser.add_argument('--force-rescan', action='store_true', help='忽略各服务器.git目录中已保存的分析结果，重新分析所有服务器')
+    parser.add_argument('--manifest', type=str, help='file_inventory.py 生成的文件清单路径 (默认: 直接遍历目录)')
+    parser.add_argument('--verify-manifest', action='store_true',
+                        help='除目录的修改时间外，还逐个检查清单中文件的大小和修改时间 (默认: 只检查目录，文件内容的变化在分析时发现)')
+    parser.add_argument('--generated-files', choices=GENERATED_POLICIES, default=GENERATED_SCAN,
+                        help='生成文件和压缩文件（*.min.js、*_pb2.py 等）的处理策略: scan 照常分析, tag 分析并标记, skip 跳过 (默认: scan)')
+    parser.add_argument('--findings-jsonl', type=str,
+                        help='分析过程中逐个服务器写出API调用的JSON Lines文件，以.gz结尾时压缩；此时结果JSON中各服务器没有 api_calls 列表，'
+                             '改为 api_calls_file（明细文件路径）和 api_call_count (默认: 运行结束后统一保存到JSON)')
+    parser.add_argument('--journal', type=str,
+                        help='按服务器记录检查点日志，指定后中途被终止可以用 --resume 继续 (默认: 不记录；只指定 --resume 时使用输出目录下的 scan_journal.jsonl)')
+    parser.add_argument('--resume', action='store_true',
+                        help='从检查点日志恢复：跳过日志中已完成的服务器，只分析剩余的服务器并生成完整报告 (日志路径由 --journal 指定，默认为输出目录下的 scan_journal.jsonl)')
+    parser.add_argument('--git-updates', type=str,
+                        help='update_git_repos.py --layout language --record 记录的各仓库更新前后的HEAD，有新提交的仓库只重新分析 git diff 中有变化的文件 (默认: 不使用)')
+    parser.add_argument('--shard', type=parse_shard,
+                        help='只分析第 i 个分片（格式 i/N，按服务器目录名称的哈希划分），结果用 merge 子命令合并 (默认: 不分片)')
+    parser.add_argument('--columnar', choices=COLUMNAR_FORMATS,
+                        help='同时按列保存分析结果: parquet 需要pyarrow, npz 需要numpy, auto 优先使用parquet (默认: 不保存)')
+    parser.add_argument('--star-edges', type=parse_star_edges, help=STAR_EDGES_HELP)
+    parser.add_argument('--db', type=str,
+                        help='SQLite结果数据库路径，每个服务器分析完成后在一个事务中替换它的全部行，多次运行的结果累积在同一个数据库中 (默认: 不使用)')
     args = parser.parse_args()
+    # 检查点日志只在指定 --journal 或 --resume 时记录
+    journal_path = args.journal or (os.path.join(args.output_dir, 'scan_journal.jsonl') if args.resume else None)
     
     # 优先使用JSON文件
     if args.json:
-        analyzer = CodeAnalyzer(max_servers=args.max_servers, json_path=args.json)
+        analyzer = CodeAnalyzer(max_servers=args.max_servers, json_path=args.json, workers=args.workers,
+                                cache_path=args.findings_cache, force_rescan=args.force_rescan,
+                                manifest_path=args.manifest, verify_manifest=args.verify_manifest,
+                                findings_jsonl=args.findings_jsonl,
+                                generated_policy=args.generated_files, shard=args.shard,
+                                journal_path=journal_path, resume=args.resume, git_updates_path=args.git_updates,
+                                columnar_format=args.columnar, results_db_path=args.db, star_edges=args.star_edges)
         # 使用完整的分析流程（包括类别分析）
-        analyzer.analyze_all_with_categories()
+        analyzer.analyze_all_with_categories(output_dir=args.output_dir)
     else:
-        analyzer = CodeAnalyzer(max_servers=args.max_servers, excel_path=args.excel)
+        analyzer = CodeAnalyzer(max_servers=args.max_servers, excel_path=args.excel, workers=args.workers,
+                                cache_path=args.findings_cache, force_rescan=args.force_rescan,
+                                manifest_path=args.manifest, verify_manifest=args.verify_manifest,
+                                findings_jsonl=args.findings_jsonl,
+                                generated_policy=args.generated_files, shard=args.shard,
+                                journal_path=journal_path, resume=args.resume, git_updates_path=args.git_updates,
+                                columnar_format=args.columnar, results_db_path=args.db, star_edges=args.star_edges)
         
         if args.excel:
             # 使用完整的分析流程（包括类别分析）
-            analyzer.analyze_all_with_categories()
+            analyzer.analyze_all_with_categories(output_dir=args.output_dir)
         else:
             # 使用原始分析流程
             if args.language:
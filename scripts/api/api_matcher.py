@@ -0,0 +1,122 @@
+"""
+危险API的多模式匹配器
+
+把 dangerous_apis.py 中每种语言的规则表编译成一个前缀树形式的正则表达式，
+对整个文件内容只扫描一遍就能找到所有规则的全部出现位置（包括互相重叠的命中），
+代替逐行 × 逐条规则的 `api in line` 检查。
+"""
+import re
+import unicodedata
+from typing import Dict, Iterable, Iterator, Tuple
+
+from dangerous_apis import APIChecker
+
+
+def _build_trie_pattern(apis: Iterable[str]) -> str:
+    """把API名称列表转换为前缀树形式的正则表达式（匹配时优先取最长的API）"""
+    trie: Dict[str, dict] = {}
+    for api in apis:
+        node = trie
+        for char in api:
+            node = node.setdefault(char, {})
+        node[''] = {}  # 结束标记
+
+    def build(node: Dict[str, dict]) -> str:
+        is_end = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        pattern = '(?:' + '|'.join(branches) + ')'
+        # 当前节点本身就是一个完整API时，后续部分可选（贪婪匹配，先尝试更长的API）
+        return pattern + '?' if is_end else pattern
+
+    return build(trie)
+
+
+# 限定名形式的API（如 os.system、Net::HTTP.get、new Function、getInstance("MD5")）只会出现在代码中；
+# 其他API（如 Ruby 的 require 'open-uri'）本身就写在字符串字面量里，命中不能按词法掩码排除
+_QUALIFIED_NAME = re.compile(r'[\w.:$ ]+(?:\(.*\))?')
+
+
+class APIMatcher:
+    """某种语言的编译后多模式匹配器"""
+
+    def __init__(self, apis: Iterable[str]):
+        self.apis = tuple(sorted(set(apis)))
+        # 出现在字符串字面量中的API，文本分析时不按词法掩码排除
+        self.literal_apis = frozenset(api for api in self.apis if not _QUALIFIED_NAME.fullmatch(api))
+        # 同一位置上命中最长API时，它的所有前缀API也同时命中
+        self._prefix_apis = {
+            api: tuple(other for other in self.apis if other != api and api.startswith(other))
+            for api in self.apis
+        }
+        # 零宽前瞻保证每个位置都会被检查，从而找到互相重叠的命中
+        self._regex = re.compile('(?=(' + _build_trie_pattern(self.apis) + '))') if self.apis else None
+
+    def finditer(self, content: str) -> Iterator[Tuple[int, str]]:
+        """按位置顺序返回内容中所有规则命中的 (偏移量, API名称)"""
+        if self._regex is None:
+            return
+        for match in self._regex.finditer(content):
+            pos = match.start()
+            api = match.group(1)
+            yield pos, api
+            for shorter_api in self._prefix_apis[api]:
+                yield pos, shorter_api
+
+
+_NON_ASCII = re.compile(rb'[\x80-\xff]')
+
+
+class TokenPrefilter:
+    """
+    基于规则叶子名称（API名称最后一个点之后的部分，如 system、popen、loads、eval）的字节级预筛选
+
+    文件内容中不包含任何叶子名称时，既不可能有AST命中，也不可能有文本命中，可以跳过解码和AST构建。
+    """
+
+    def __init__(self, apis: Iterable[str]):
+        self.leaves = tuple(sorted({api.rsplit('.', 1)[-1] for api in apis} - {''}))
+        self._regex = re.compile(_build_trie_pattern(self.leaves).encode('utf-8')) if self.leaves else None
+
+    def may_match(self, data) -> bool:
+        """文件内容（bytes 或 mmap）中是否可能存在规则命中"""
+        if self._regex is None:
+            return False
+        if self._regex.search(data):
+            return True
+        if _NON_ASCII.search(data) is None:
+            return False
+        # Python会把非ASCII标识符按NFKC规范化（如全角字母），规范化后再检查一次
+        try:
+            text = str(data, 'utf-8')
+        except UnicodeDecodeError:
+            return False  # 无法解码的文件按空文件处理
+        return self._regex.search(unicodedata.normalize('NFKC', text).encode('utf-8')) is not None
+
+
+# 每种检查器类型只编译一次
+_matcher_cache: Dict[type, APIMatcher] = {}
+_prefilter_cache: Dict[type, TokenPrefilter] = {}
+
+
+def get_matcher(checker: APIChecker) -> APIMatcher:
+    """获取检查器对应的匹配器（按检查器类型缓存）"""
+    checker_type = type(checker)
+    matcher = _matcher_cache.get(checker_type)
+    if matcher is None:
+        matcher = APIMatcher(checker.dangerous_apis)
+        _matcher_cache[checker_type] = matcher
+    return matcher
+
+
+def get_prefilter(checker: APIChecker) -> TokenPrefilter:
+    """获取检查器对应的预筛选器（按检查器类型缓存）"""
+    checker_type = type(checker)
+    prefilter = _prefilter_cache.get(checker_type)
+    if prefilter is None:
+        prefilter = TokenPrefilter(checker.dangerous_apis)
+        _prefilter_cache[checker_type] = prefilter
+    return prefilter
@@ -1,5 +1,9 @@
+import hashlib
+import json
+import sys
 from abc import ABC, abstractmethod
-from typing import Set, Dict, Optional
+from types import MappingProxyType
+from typing import AbstractSet, Dict, NamedTuple, Optional
 
 # 定义威胁类型
 THREAT_TYPES = {
@@ -27,13 +31,19 @@ THREAT_TYPES = {
     'WEAK_ENCRYPTION': '弱加密'
 }
 
+class RuleInfo(NamedTuple):
+    """规则表中单个危险API的信息（字符串均已驻留）"""
+    description: str
+    threat_type: str
+    resource_type: str
+
 class APIChecker(ABC):
     """API检查器的基类"""
     
     @property
     @abstractmethod
-    def dangerous_apis(self) -> Set[str]:
-        """返回危险API列表"""
+    def dangerous_apis(self) -> AbstractSet[str]:
+        """返回危险API列表（只读视图）"""
         pass
         
     @abstractmethod
@@ -50,6 +60,10 @@ class APIChecker(ABC):
     def get_api_threat_type(self, api_name: str) -> str:
         """获取API的威胁类型"""
         pass
+        
+    def get_api_resource_type(self, api_name: str) -> str:
+        """获取API的资源类型"""
+        return self._dangerous_apis.get(api_name, {}).get('resource_type', 'UNKNOWN')
 
 class PythonAPIChecker(APIChecker):
     """Python语言的API检查器"""
@@ -381,8 +395,8 @@ class PythonAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -552,8 +566,8 @@ class TypeScriptAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -656,8 +670,8 @@ class RustAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -750,8 +764,8 @@ class GoAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -1002,8 +1016,8 @@ class JavaAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -1156,8 +1170,8 @@ class CppAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -1280,8 +1294,8 @@ class CSharpAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -1430,8 +1444,8 @@ class PHPAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -1566,8 +1580,8 @@ class RubyAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -1687,8 +1701,8 @@ class SwiftAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -1810,8 +1824,8 @@ class KotlinAPIChecker(APIChecker):
         }
         
     @property
-    def dangerous_apis(self) -> Set[str]:
-        return set(self._dangerous_apis.keys())
+    def dangerous_apis(self) -> AbstractSet[str]:
+        return self._dangerous_apis.keys()
         
     def is_dangerous_api(self, api_name: str) -> bool:
         return api_name in self._dangerous_apis
@@ -1825,30 +1839,64 @@ class KotlinAPIChecker(APIChecker):
     def get_api_resource_type(self, api_name: str) -> str:
         return self._dangerous_apis.get(api_name, {}).get('resource_type', 'UNKNOWN')
 
+# 语言名称（含别名）到检查器类型的映射
+CHECKER_CLASSES = {
+    'python': PythonAPIChecker,
+    'javascript': TypeScriptAPIChecker,
+    'typescript': TypeScriptAPIChecker,
+    'js': TypeScriptAPIChecker,
+    'ts': TypeScriptAPIChecker,
+    'java': JavaAPIChecker,
+    'c': CppAPIChecker,
+    'cpp': CppAPIChecker,
+    'c++': CppAPIChecker,
+    'rust': RustAPIChecker,
+    'go': GoAPIChecker,
+    'csharp': CSharpAPIChecker,
+    'c#': CSharpAPIChecker,
+    'php': PHPAPIChecker,
+    'ruby': RubyAPIChecker,
+    'swift': SwiftAPIChecker,
+    'kotlin': KotlinAPIChecker
+}
+
+# 进程内的检查器注册表，每种检查器只构建一次
+_checker_registry: Dict[type, APIChecker] = {}
+
+def _freeze_checker(checker: APIChecker) -> APIChecker:
+    """
+    把检查器的规则表冻结为只读的查找表：
+    - rules: API名称 -> RuleInfo（字符串驻留，同一描述/类型在所有结果中共享同一对象）
+    - ruleset_version: 规则表内容的哈希，规则表有任何改动时随之改变
+    """
+    table = json.dumps(checker._dangerous_apis, ensure_ascii=False, sort_keys=True)
+    checker.ruleset_version = hashlib.sha1(table.encode('utf-8')).hexdigest()[:16]
+
+    rules = {}
+    for api_name, info in checker._dangerous_apis.items():
+        rules[sys.intern(api_name)] = RuleInfo(
+            description=sys.intern(info.get('description', '未知的危险API')),
+            threat_type=sys.intern(info.get('threat_type', 'UNKNOWN')),
+            resource_type=sys.intern(info.get('resource_type', 'UNKNOWN'))
+        )
+    checker.rules = MappingProxyType(rules)
+    checker._dangerous_apis = MappingProxyType(
+        {api_name: MappingProxyType(info) for api_name, info in checker._dangerous_apis.items()}
+    )
+    return checker
+
 def get_checker(language: str) -> APIChecker:
-    """根据语言获取对应的API检查器"""
-    language = language.lower()
-    if language == 'python':
-        return PythonAPIChecker()
-    elif language in ('javascript', 'typescript', 'js', 'ts'):
-        return TypeScriptAPIChecker()
-    elif language == 'java':
-        return JavaAPIChecker()
-    elif language in ('c', 'cpp', 'c++'):
-        return CppAPIChecker()
-    elif language == 'rust':
-        return RustAPIChecker()
-    elif language == 'go':
-        return GoAPIChecker()
-    elif language in ('csharp', 'c#'):
-        return CSharpAPIChecker()
-    elif language == 'php':
-        return PHPAPIChecker()
-    elif language == 'ruby':
-        return RubyAPIChecker()
-    elif language == 'swift':
-        return SwiftAPIChecker()
-    elif language == 'kotlin':
-        return KotlinAPIChecker()
-    else:
-        raise ValueError(f"不支持的语言: {language}")
\ No newline at end of file
+    """根据语言获取对应的API检查器（同一进程内共享，规则表只读）"""
+    checker_class = CHECKER_CLASSES.get(language.lower())
+    if checker_class is None:
+        raise ValueError(f"不支持的语言: {language.lower()}")
+
+    checker = _checker_registry.get(checker_class)
+    if checker is None:
+        checker = _freeze_checker(checker_class())
+        _checker_registry[checker_class] = checker
+    return checker
+
+def get_ruleset_version(language: str) -> str:
+    """根据语言的规则表内容计算规则集版本，规则表有任何改动时版本随之改变"""
+    return get_checker(language).ruleset_version
@@ -0,0 +1,101 @@
+"""
+紧凑的单条分析结果
+
+每条结果是一个带 __slots__ 的 Finding 对象，而不是包含11个键的字典：
+- 文件路径、函数名、语言、服务器名称都是驻留的字符串，同一个值在所有结果中共享同一个对象
+- 描述、威胁类型和资源类型不单独保存，而是引用规则表中共享的 RuleInfo
+
+Finding 实现了只读映射接口（finding['api_name']、finding.get(...)、dict(finding)），
+按原来的字典格式输出，序列化时使用 json.dump(..., default=dict)。
+"""
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+from dangerous_apis import RuleInfo, get_checker
+
+# 映射接口中的键，顺序与原来的字典一致
+_BASE_KEYS = ("file", "line", "column", "api_name", "function", "description", "threat_type", "resource_type")
+_OPTIONAL_KEYS = ("language", "generated", "server")  # 值为None时不出现
+_RULE_KEYS = {"description": 0, "threat_type": 1, "resource_type": 2}
+# 可以通过 finding[key] = value 修改的键（其余键由规则决定）
+_WRITABLE_KEYS = {"file", "line", "column", "function", "language", "generated", "server"}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+class Finding(Mapping):
+    """单条分析结果"""
+
+    __slots__ = ("file", "line", "column", "api_name", "rule", "function", "language", "generated", "server")
+
+    def __init__(self, file: Optional[str], line: int, column: int, api_name: str, rule: RuleInfo, function: str,
+                 language: Optional[str] = None, generated: Optional[str] = None, server: Optional[str] = None):
+        self.file = _intern(file)
+        self.line = line
+        self.column = column
+        self.api_name = sys.intern(api_name)
+        self.rule = rule
+        self.function = _intern(function)
+        self.language = _intern(language)
+        self.generated = generated
+        self.server = _intern(server)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Finding":
+        """从字典格式（缓存、已保存的结果）恢复，规则信息与规则表一致时引用规则表中的 RuleInfo"""
+        api_name = data.get("api_name", "")
+        rule = RuleInfo(
+            description=data.get("description", "未知的危险API"),
+            threat_type=data.get("threat_type", "UNKNOWN"),
+            resource_type=data.get("resource_type", "UNKNOWN")
+        )
+        language = data.get("language")
+        if language:
+            try:
+                shared_rule = get_checker(language).rules.get(api_name)
+            except ValueError:
+                shared_rule = None
+            if shared_rule == rule:
+                rule = shared_rule
+        return cls(data.get("file"), data.get("line", 0), data.get("column", 0), api_name, rule,
+                   data.get("function", ""), language, data.get("generated"), data.get("server"))
+
+    def copy(self, **changes) -> "Finding":
+        """复制一条结果，可以同时修改 file、server 等字段"""
+        finding = Finding.__new__(Finding)
+        for name in Finding.__slots__:
+            setattr(finding, name, getattr(self, name))
+        for key, value in changes.items():
+            finding[key] = value
+        return finding
+
+    def __reduce__(self):
+        # 从工作进程传回时重新驻留字符串、引用规则表中共享的 RuleInfo
+        return Finding.from_dict, (dict(self),)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _RULE_KEYS:
+            return self.rule[_RULE_KEYS[key]]
+        if key in _BASE_KEYS or (key in _OPTIONAL_KEYS and getattr(self, key) is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in _WRITABLE_KEYS:
+            raise KeyError(key)
+        setattr(self, key, _intern(value) if isinstance(value, str) else value)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from _BASE_KEYS
+        for key in _OPTIONAL_KEYS:
+            if getattr(self, key) is not None:
+                yield key
+
+    def __len__(self) -> int:
+        return len(_BASE_KEYS) + sum(getattr(self, key) is not None for key in _OPTIONAL_KEYS)
+
+    def __repr__(self) -> str:
+        return f"Finding({dict(self)!r})"
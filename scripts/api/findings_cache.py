@@ -0,0 +1,89 @@
+"""
+基于文件内容寻址的分析结果缓存
+
+以 (git blob SHA, 语言, 规则集版本) 为键保存单个文件的分析结果。
+文件内容未变化时直接复用已保存的结果；某种语言的规则表改动后，
+只有该语言的缓存条目失效。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+
+def git_blob_sha(data: bytes) -> str:
+    """计算文件内容的 git blob SHA-1（与 `git hash-object` 的结果一致）"""
+    sha = hashlib.sha1(f"blob {len(data)}\0".encode())
+    sha.update(data)
+    return sha.hexdigest()
+
+
+class FindingsCache:
+    """保存在SQLite数据库中的单文件分析结果缓存"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        cache_dir = os.path.dirname(os.path.abspath(db_path))
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        # 多个扫描进程可能同时读写同一个缓存文件
+        self._conn = sqlite3.connect(db_path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_findings (
+                blob_sha TEXT NOT NULL,
+                language TEXT NOT NULL,
+                ruleset_version TEXT NOT NULL,
+                findings TEXT NOT NULL,
+                PRIMARY KEY (blob_sha, language, ruleset_version)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, blob_sha: str, language: str, ruleset_version: str, file_path: str) -> Optional[List[Dict[str, Any]]]:
+        """查找缓存的分析结果，命中时把文件路径填回每条结果"""
+        row = self._conn.execute(
+            "SELECT findings FROM file_findings WHERE blob_sha = ? AND language = ? AND ruleset_version = ?",
+            (blob_sha, language, ruleset_version)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        findings = json.loads(row[0])
+        for finding in findings:
+            finding["file"] = file_path
+        return findings
+
+    def put(self, blob_sha: str, language: str, ruleset_version: str, findings: List[Dict[str, Any]]):
+        """保存分析结果（内容相同的文件可能位于不同路径，因此不保存文件路径）"""
+        stored = [{key: value for key, value in finding.items() if key != "file"} for finding in findings]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO file_findings (blob_sha, language, ruleset_version, findings) VALUES (?, ?, ?, ?)",
+            (blob_sha, language, ruleset_version, json.dumps(stored, ensure_ascii=False))
+        )
+
+    def prune(self, ruleset_versions: Dict[str, str]) -> int:
+        """删除规则集版本已过期的条目，返回删除的条目数"""
+        removed = 0
+        for language, ruleset_version in ruleset_versions.items():
+            cursor = self._conn.execute(
+                "DELETE FROM file_findings WHERE language = ? AND ruleset_version != ?",
+                (language, ruleset_version)
+            )
+            removed += cursor.rowcount
+        self._conn.commit()
+        return removed
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
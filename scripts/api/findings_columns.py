@@ -0,0 +1,225 @@
+"""
+按列保存的分析结果
+
+把 analysis_result_*.json 中各服务器的API调用展开成列：服务器、语言、API名称、函数、描述、威胁类型、
+资源类型、生成文件标记这些重复度很高的字符串列使用字典编码（int32编码 + 取值表），文件路径、行号、列号
+保存为普通列。
+
+安装了pyarrow时写出Parquet文件（字典编码由Parquet原生支持），否则写出NumPy的.npz文件：
+    <列名>_codes   字典编码列的int32编码数组
+    <列名>_values  字典编码列的取值表
+    <列名>         普通列
+威胁类型统计 (threat_analyzer.py) 和安全统计表只需要其中两三列，读取时只加载需要的列，
+不必解析包含全部API调用明细的JSON文件。
+"""
+import gzip
+import json
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 字典编码列：API调用信息中的字段名（server、language 来自服务器）
+DICTIONARY_COLUMNS = ('server', 'language', 'api_call', 'function', 'description', 'threat_type', 'resource_type',
+                      'generated')
+# 汇总统计字段 -> 对应的列
+SUMMARY_FIELDS = {'threat_types': 'threat_type', 'resource_types': 'resource_type'}
+
+COLUMNAR_FORMATS = ('auto', 'parquet', 'npz')
+
+
+def _iter_api_calls(final_results: Dict[str, Any]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """按结果文件中的顺序依次返回 (服务器, 语言, API调用信息)，流式输出的服务器从JSON Lines文件中读取"""
+    streamed_files = []
+    for server_name, server_data in final_results.items():
+        if 'api_calls' in server_data:
+            for api_call_info in server_data['api_calls']:
+                yield server_name, server_data['language'], api_call_info
+        elif server_data.get('api_calls_file') and server_data['api_calls_file'] not in streamed_files:
+            streamed_files.append(server_data['api_calls_file'])
+
+    for api_calls_file in streamed_files:
+        opener = gzip.open if api_calls_file.endswith('.gz') else open
+        with opener(api_calls_file, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record['server'] in final_results:
+                    yield record['server'], record['language'], record
+
+
+def encode_columns(final_results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把按服务器归类的结果编码为列
+
+    Returns:
+        dict: 字典编码列 -> (编码数组, 取值表)，普通列 -> 数组（路径列为字符串列表）
+    """
+    lookups = {name: {} for name in DICTIONARY_COLUMNS}
+    codes = {name: array('i') for name in DICTIONARY_COLUMNS}
+    paths: List[str] = []
+    lines = array('i')
+    cols = array('i')
+
+    # 服务器取值表按结果文件中的顺序排列，没有API调用的服务器也保留
+    for server_name in final_results:
+        lookups['server'].setdefault(server_name, len(lookups['server']))
+
+    for server_name, language, api_call_info in _iter_api_calls(final_results):
+        row = {'server': server_name, 'language': language}
+        for name in DICTIONARY_COLUMNS:
+            value = row[name] if name in row else api_call_info.get(name) or ''
+            lookup = lookups[name]
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+            codes[name].append(code)
+        paths.append(api_call_info.get('path', ''))
+        lines.append(api_call_info.get('line', 0))
+        cols.append(api_call_info.get('column', 0))
+
+    columns = {name: (codes[name], list(lookups[name])) for name in DICTIONARY_COLUMNS}
+    columns.update({'path': paths, 'line': lines, 'column': cols})
+    return columns
+
+
+def _write_parquet(columns: Dict[str, Any], output_path: str) -> str:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrays = {}
+    for name in DICTIONARY_COLUMNS:
+        column_codes, values = columns[name]
+        arrays[name] = pa.DictionaryArray.from_arrays(pa.array(column_codes, type=pa.int32()),
+                                                      pa.array(values, type=pa.string()))
+    arrays['path'] = pa.array(columns['path'], type=pa.string())
+    arrays['line'] = pa.array(columns['line'], type=pa.int32())
+    arrays['column'] = pa.array(columns['column'], type=pa.int32())
+    table = pa.table(arrays)
+    # 没有API调用的服务器不会出现在编码中，单独保存完整的服务器取值表
+    table = table.replace_schema_metadata({'servers': json.dumps(columns['server'][1], ensure_ascii=False)})
+    pq.write_table(table, output_path)
+    return output_path
+
+
+def _write_npz(columns: Dict[str, Any], output_path: str) -> str:
+    import numpy as np
+
+    arrays = {}
+    for name in DICTIONARY_COLUMNS:
+        column_codes, values = columns[name]
+        arrays[f'{name}_codes'] = np.asarray(column_codes, dtype=np.int32)
+        arrays[f'{name}_values'] = np.array(values, dtype=str)
+    arrays['path'] = np.array(columns['path'], dtype=str)
+    arrays['line'] = np.asarray(columns['line'], dtype=np.int32)
+    arrays['column'] = np.asarray(columns['column'], dtype=np.int32)
+    np.savez_compressed(output_path, **arrays)
+    return output_path
+
+
+def write_columns(final_results: Dict[str, Any], output_base: str, columnar_format: str = 'auto') -> Optional[str]:
+    """
+    按列保存分析结果，返回写出的文件路径（未安装所需的库时返回None）
+
+    Args:
+        final_results: 按服务器归类的结果（与 analysis_result_*.json 的内容相同）
+        output_base: 不带扩展名的输出文件路径
+        columnar_format: 'parquet'、'npz'，或 'auto' 表示安装了pyarrow时用Parquet，否则用.npz
+    """
+    if columnar_format in ('auto', 'parquet'):
+        try:
+            import pyarrow.parquet  # noqa: F401
+            return _write_parquet(encode_columns(final_results), output_base + '.parquet')
+        except ImportError:
+            if columnar_format == 'parquet':
+                print("警告: 未安装pyarrow包，改为保存为.npz文件")
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("警告: 未安装numpy包，无法按列保存分析结果")
+        return None
+    return _write_npz(encode_columns(final_results), output_base + '.npz')
+
+
+def load_columns(path: str, columns: Iterable[str]) -> Dict[str, Any]:
+    """
+    只加载指定的列
+
+    Returns:
+        dict: 字典编码列 -> (int32编码数组, 取值列表)，普通列 -> 数组；
+              加载 server 列时，取值列表包含没有API调用的服务器
+    """
+    columns = list(columns)
+    loaded = {}
+    if path.endswith('.parquet'):
+        import numpy as np
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path, columns=columns)
+        # 多个行组的字典可能不同，先统一字典再合并
+        table = table.unify_dictionaries()
+        for name in columns:
+            column = table.column(name).combine_chunks()
+            if name in DICTIONARY_COLUMNS:
+                loaded[name] = (column.indices.to_numpy(zero_copy_only=False), column.dictionary.to_pylist())
+            else:
+                loaded[name] = column.to_numpy(zero_copy_only=False)
+        if 'server' in loaded:
+            metadata = pq.read_schema(path).metadata or {}
+            if b'servers' in metadata:
+                # 读回的字典只包含出现过的服务器，且顺序不一定与写出时相同，换算到完整的服务器取值表
+                server_codes, dictionary = loaded['server']
+                servers = json.loads(metadata[b'servers'])
+                positions = {server_name: index for index, server_name in enumerate(servers)}
+                remap = np.array([positions[server_name] for server_name in dictionary], dtype=np.int32)
+                loaded['server'] = (remap[server_codes] if len(remap) else server_codes, servers)
+    else:
+        import numpy as np
+
+        # NpzFile 按需解压，只读取访问到的数组
+        with np.load(path, allow_pickle=False) as data:
+            for name in columns:
+                if name in DICTIONARY_COLUMNS:
+                    loaded[name] = (data[f'{name}_codes'], data[f'{name}_values'].tolist())
+                else:
+                    loaded[name] = data[name]
+    return loaded
+
+
+def summarize_servers(path: str, fields: Iterable[str] = ('threat_types', 'resource_types')) -> Dict[str, Dict[str, Any]]:
+    """
+    从按列保存的结果中计算每个服务器的汇总统计，只加载 server、language 和所需统计字段对应的列
+
+    Args:
+        path: write_columns 写出的 .parquet 或 .npz 文件
+        fields: 需要的统计字段（threat_types / resource_types）
+
+    Returns:
+        dict: 服务器名称 -> {"language": ..., 统计字段: {取值: API调用数}}，与 analysis_result_*.json 的汇总部分相同
+    """
+    import numpy as np
+
+    fields = list(fields)
+    loaded = load_columns(path, ['server', 'language'] + [SUMMARY_FIELDS[field] for field in fields])
+    server_codes, servers = loaded['server']
+    language_codes, languages = loaded['language']
+    server_codes = np.asarray(server_codes, dtype=np.int64)
+
+    results = {server_name: {"language": "Unknown", **{field: {} for field in fields}} for server_name in servers}
+    # 服务器的语言取它第一条API调用的语言
+    present, first_rows = np.unique(server_codes, return_index=True)
+    for server_code, row in zip(present.tolist(), first_rows.tolist()):
+        results[servers[server_code]]["language"] = languages[language_codes[row]]
+
+    for field in fields:
+        value_codes, values = loaded[SUMMARY_FIELDS[field]]
+        # (服务器, 取值) 组合成一个整数后计数
+        pairs, counts = np.unique(server_codes * len(values) + np.asarray(value_codes, dtype=np.int64),
+                                  return_counts=True)
+        first_seen = {}
+        for pair, count in zip(pairs.tolist(), counts.tolist()):
+            server_code, value_code = divmod(pair, len(values))
+            first_seen.setdefault(server_code, []).append((value_code, count))
+        for server_code, value_counts in first_seen.items():
+            results[servers[server_code]][field] = {values[value_code]: count for value_code, count in value_counts}
+    return results
@@ -0,0 +1,69 @@
+"""
+按服务器流式写出的分析结果
+
+每个服务器分析完成后，立即把它的全部API调用追加写入JSON Lines文件（文件名以 .gz 结尾时使用gzip压缩），
+内存中只保留每个服务器的汇总统计（威胁类型、资源类型计数），不再保留全部结果直到运行结束。
+
+每行对应一个API调用：
+    {"server": ..., "language": ..., "path": ..., "line": ..., "column": ..., "api_call": ...,
+     "function": ..., "description": ..., "threat_type": ..., "resource_type": ...}
+
+使用流式输出时，analysis_result_*.json 中各服务器的格式与不使用时不同：没有 api_calls 列表，
+改为 api_calls_file（本文件的路径）和 api_call_count（API调用数），威胁类型、资源类型的汇总统计不变：
+    {"<服务器>": {"language": ..., "api_calls_file": ..., "api_call_count": ..., "threat_types": {...}, "resource_types": {...}}}
+读取明细的程序应按 api_calls_file 从本文件中筛选该服务器的记录（见 findings_columns._iter_api_calls）。
+"""
+import gzip
+import json
+import os
+from typing import Any, Dict, List
+
+
+class FindingsSink:
+    """分析结果的JSON Lines输出，同时维护每个服务器的汇总统计"""
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        if output_path.endswith('.gz'):
+            self._file = gzip.open(output_path, 'wt', encoding='utf-8')
+        else:
+            self._file = open(output_path, 'w', encoding='utf-8')
+        # 服务器名称 -> 汇总统计，格式与 analysis_result_*.json 相同，只是用 api_call_count 代替 api_calls 列表
+        self.summaries: Dict[str, Dict[str, Any]] = {}
+        self.api_call_count = 0
+
+    def write_server(self, server_name: str, language: str, api_calls: List[Dict[str, Any]]):
+        """追加写入一个服务器的API调用，并更新该服务器的汇总统计"""
+        summary = self.summaries.get(server_name)
+        if summary is None:
+            summary = {
+                "language": language,
+                "api_calls_file": self.output_path,
+                "api_call_count": 0,
+                "threat_types": {},
+                "resource_types": {}
+            }
+            self.summaries[server_name] = summary
+
+        threat_types = summary["threat_types"]
+        resource_types = summary["resource_types"]
+        for api_call_info in api_calls:
+            record = {"server": server_name, "language": summary["language"]}
+            record.update(api_call_info)
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+            threat_type = api_call_info["threat_type"]
+            resource_type = api_call_info["resource_type"]
+            threat_types[threat_type] = threat_types.get(threat_type, 0) + 1
+            resource_types[resource_type] = resource_types.get(resource_type, 0) + 1
+
+        summary["api_call_count"] += len(api_calls)
+        self.api_call_count += len(api_calls)
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
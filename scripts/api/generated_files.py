@@ -0,0 +1,83 @@
+"""
+生成文件和压缩文件的识别
+
+不在 excluded_dirs 中、但提交在源码目录里的压缩脚本（*.min.js、webpack打包结果）、source map、
+protobuf / gRPC 生成代码等文件，逐行扫描既慢，命中也大多是噪音。这里按以下规则低成本地识别：
+- 文件名模式（如 *.min.js、*_pb2.py、*.pb.go）
+- 文件头部的生成标记（如 @generated、Code generated ... DO NOT EDIT）
+- 文件开头部分的平均行长度（压缩后的代码通常只有很少几行超长的行）
+
+识别出的文件按策略处理：scan（照常分析）、tag（照常分析并在结果中标记）、skip（跳过）。
+"""
+import os
+import re
+from typing import Optional
+
+# 处理策略
+GENERATED_SCAN = 'scan'
+GENERATED_TAG = 'tag'
+GENERATED_SKIP = 'skip'
+GENERATED_POLICIES = (GENERATED_SCAN, GENERATED_TAG, GENERATED_SKIP)
+
+# 识别原因
+REASON_NAME = 'name'
+REASON_HEADER = 'header'
+REASON_MINIFIED = 'minified'
+
+# 生成文件和压缩文件的文件名模式
+GENERATED_NAME_PATTERN = re.compile(
+    r'(?:'
+    r'[.-]min\.(?:js|mjs|cjs)'                     # 压缩脚本
+    r'|[.-]bundle\.(?:js|mjs)|\.chunk\.js'         # webpack 等打包结果
+    r'|\.(?:js|mjs|cjs|ts)\.map'                   # source map
+    r'|_pb2(?:_grpc)?\.pyi?'                       # Python protobuf / gRPC
+    r'|\.pb(?:\.gw)?\.go|_grpc\.pb\.go'            # Go protobuf / gRPC
+    r'|\.pb\.(?:cc|h)|\.grpc\.pb\.(?:cc|h)'        # C++ protobuf / gRPC
+    r'|_pb\.(?:js|d\.ts)|_grpc_pb\.(?:js|d\.ts)'   # JS/TS protobuf / gRPC
+    r'|\.pb\.swift|\.grpc\.swift'                  # Swift protobuf / gRPC
+    r'|\.designer\.cs|\.g\.cs|\.g\.i\.cs'          # .NET 生成代码
+    r')$',
+    re.IGNORECASE
+)
+
+# 文件头部的生成标记（只检查开头部分）
+HEADER_SIZE = 4096
+GENERATED_HEADER_PATTERN = re.compile(
+    rb'@generated'
+    rb'|Code generated .{0,200}DO NOT EDIT'
+    rb'|Generated by the protocol buffer compiler'
+    rb'|<auto-generated'
+    rb'|This file (?:is|was) (?:automatically|auto-?)generated',
+    re.IGNORECASE
+)
+
+# 按文件开头部分的平均行长度识别压缩代码
+MINIFIED_SAMPLE_SIZE = 65536
+MINIFIED_MIN_SIZE = 4096
+MINIFIED_AVG_LINE_LENGTH = 500
+
+
+def detect_generated(file_path: str, data) -> Optional[str]:
+    """
+    判断文件是否是生成文件或压缩文件
+
+    Args:
+        file_path: 文件路径
+        data: 文件内容（bytes 或 mmap）
+
+    Returns:
+        识别原因（REASON_NAME / REASON_HEADER / REASON_MINIFIED），不是生成文件时返回None
+    """
+    if GENERATED_NAME_PATTERN.search(os.path.basename(file_path)):
+        return REASON_NAME
+
+    if GENERATED_HEADER_PATTERN.search(data[:HEADER_SIZE]):
+        return REASON_HEADER
+
+    sample = data[:MINIFIED_SAMPLE_SIZE]
+    if len(sample) >= MINIFIED_MIN_SIZE:
+        line_count = sample.count(b'\n') + 1
+        if len(sample) / line_count > MINIFIED_AVG_LINE_LENGTH:
+            return REASON_MINIFIED
+
+    return None
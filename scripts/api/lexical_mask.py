@@ -0,0 +1,183 @@
+"""
+注释 / 字符串的词法掩码
+
+每个文件只运行一次按语言划分的小型词法分析器，把注释和字符串字面量所在的区间标记出来，
+得到与内容等长的掩码（bytearray，非代码位置为1），文本分析时每个候选命中按起始位置 O(1) 判断是否位于代码中。
+
+带插值的字符串（JS/TS 的 `...${expr}...`、Python 的 f"{expr}"、Ruby 的 "#{expr}" 等）中的插值表达式是代码，
+只标记插值前后的字面文本，插值部分（按括号配对找到结尾，没有配对时到字符串结尾）不做标记，避免漏报。
+"""
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+# 常用的词法单元
+_LINE_COMMENT = r'//[^\n]*'
+_HASH_COMMENT = r'#[^\n]*'
+_BLOCK_COMMENT = r'/\*.*?(?:\*/|\Z)'
+_DOUBLE_QUOTED = r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"?'
+_SINGLE_QUOTED = r"'[^'\\\n]*(?:\\.[^'\\\n]*)*'?"
+_CHAR_LITERAL = r"'(?:\\[^'\n]{1,10}|[^\\'\n])'"  # 单个字符，避免把 Rust 的生命周期 'a 当作字符串
+_TRIPLE_DOUBLE = r'"""[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*(?:"""|\Z)'
+_TRIPLE_SINGLE = r"'''[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*(?:'''|\Z)"
+_BACKTICK = r'`[^`\\]*(?:\\.[^`\\]*)*(?:`|\Z)'
+
+# 每种语言的词法规则：[(类型, 正则, 插值标记)]
+# 类型为 comment 或 string；字符串中插值标记开始的插值表达式不做标记
+# 普通引号字符串只在一行内匹配：heredoc、正则字面量中的引号等识别错误时，影响范围不超过当前行
+_C_LIKE = [
+    ('comment', _LINE_COMMENT, ()),
+    ('comment', _BLOCK_COMMENT, ()),
+    ('string', _DOUBLE_QUOTED, ()),
+    ('string', _CHAR_LITERAL, ()),
+]
+LEXER_RULES: Dict[str, List[Tuple[str, str, Tuple[str, ...]]]] = {
+    'typescript': [
+        ('comment', _LINE_COMMENT, ()),
+        ('comment', _BLOCK_COMMENT, ()),
+        ('string', _BACKTICK, ('${',)),
+        ('string', _DOUBLE_QUOTED, ()),
+        ('string', _SINGLE_QUOTED, ()),
+    ],
+    'java': [
+        ('comment', _LINE_COMMENT, ()),
+        ('comment', _BLOCK_COMMENT, ()),
+        ('string', _TRIPLE_DOUBLE, ()),
+        ('string', _DOUBLE_QUOTED, ()),
+        ('string', _CHAR_LITERAL, ()),
+    ],
+    'kotlin': [
+        ('comment', _LINE_COMMENT, ()),
+        ('comment', _BLOCK_COMMENT, ()),
+        ('string', _TRIPLE_DOUBLE, ('${',)),
+        ('string', _DOUBLE_QUOTED, ('${',)),
+        ('string', _CHAR_LITERAL, ()),
+    ],
+    'swift': [
+        ('comment', _LINE_COMMENT, ()),
+        ('comment', _BLOCK_COMMENT, ()),
+        ('string', _TRIPLE_DOUBLE, ('\\(',)),
+        ('string', _DOUBLE_QUOTED, ('\\(',)),
+    ],
+    'csharp': [
+        ('comment', _LINE_COMMENT, ()),
+        ('comment', _BLOCK_COMMENT, ()),
+        ('string', r'\$@?"[^"\\\n]*(?:\\.[^"\\\n]*)*"?', ('{',)),  # 插值字符串 $"..."
+        ('string', r'@"[^"]*(?:""[^"]*)*"?', ()),                 # 逐字字符串 @"..."
+        ('string', _DOUBLE_QUOTED, ()),
+        ('string', _CHAR_LITERAL, ()),
+    ],
+    'cpp': _C_LIKE,
+    'c': _C_LIKE,
+    'rust': [
+        ('comment', _LINE_COMMENT, ()),
+        ('comment', _BLOCK_COMMENT, ()),
+        ('string', _DOUBLE_QUOTED, ()),
+        ('string', _CHAR_LITERAL, ()),
+    ],
+    'go': [
+        ('comment', _LINE_COMMENT, ()),
+        ('comment', _BLOCK_COMMENT, ()),
+        ('string', _BACKTICK, ()),
+        ('string', _DOUBLE_QUOTED, ()),
+        ('string', _CHAR_LITERAL, ()),
+    ],
+    'php': [
+        ('comment', r'(?://|#)[^\n]*', ()),
+        ('comment', _BLOCK_COMMENT, ()),
+        ('string', _DOUBLE_QUOTED, ('{$', '${')),
+        ('string', _SINGLE_QUOTED, ()),
+    ],
+    'python': [
+        ('comment', _HASH_COMMENT, ()),
+        ('string', _TRIPLE_DOUBLE, ('{',)),
+        ('string', _TRIPLE_SINGLE, ('{',)),
+        ('string', _DOUBLE_QUOTED, ('{',)),
+        ('string', _SINGLE_QUOTED, ('{',)),
+    ],
+    'ruby': [
+        ('comment', r'^=begin\b.*?(?:^=end\b[^\n]*|\Z)', ()),
+        ('comment', _HASH_COMMENT, ()),
+        ('string', _DOUBLE_QUOTED, ('#{',)),
+        ('string', _SINGLE_QUOTED, ()),
+    ],
+}
+LEXER_RULES['javascript'] = LEXER_RULES['typescript']
+
+# Python 只有 f 字符串才有插值
+_PYTHON_FSTRING_PREFIX = re.compile(r'[rRbBuU]?[fF][rR]?$')
+
+_lexer_cache: Dict[str, Tuple[Pattern, List[Tuple[str, Tuple[str, ...]]]]] = {}
+
+
+def _get_lexer(language: str) -> Optional[Tuple[Pattern, List[Tuple[str, Tuple[str, ...]]]]]:
+    """获取语言的词法分析正则（所有规则合并为一个正则，按组号区分规则）"""
+    lexer = _lexer_cache.get(language)
+    if lexer is None:
+        rules = LEXER_RULES.get(language)
+        if rules is None:
+            return None
+        pattern = '|'.join(f'({rule_pattern})' for _, rule_pattern, _ in rules)
+        lexer = (re.compile(pattern, re.DOTALL | re.MULTILINE), [(kind, markers) for kind, _, markers in rules])
+        _lexer_cache[language] = lexer
+    return lexer
+
+
+def _interpolation_spans(text: str, markers: Tuple[str, ...]) -> List[Tuple[int, int]]:
+    """
+    字符串中插值表达式（含插值标记和配对的右括号）所在的区间，位置相对于字符串开头
+
+    标记以 ( 结尾时按 () 配对，否则按 {} 配对；没有配对的右括号时区间到字符串结尾
+    """
+    spans = []
+    pos = 0
+    while True:
+        found = [(text.find(marker, pos), marker) for marker in markers]
+        found = [(index, marker) for index, marker in found if index >= 0]
+        if not found:
+            return spans
+        index, marker = min(found)
+        body = index + len(marker)
+        if marker == '{' and text.startswith('{', body):
+            # {{ 是转义的字面量花括号（Python f 字符串、C# 插值字符串）
+            pos = body + 1
+            continue
+        if marker != '\\(' and (index - len(text[:index].rstrip('\\'))) % 2:
+            # \${ 等前面有奇数个反斜杠（被转义）的插值标记是字面文本
+            pos = body
+            continue
+        opener, closer = ('(', ')') if marker.endswith('(') else ('{', '}')
+        depth = 1
+        end = body
+        while end < len(text) and depth:
+            if text[end] == opener:
+                depth += 1
+            elif text[end] == closer:
+                depth -= 1
+            end += 1
+        spans.append((index, end))
+        pos = end
+
+
+def build_mask(content: str, language: str) -> Optional[bytearray]:
+    """
+    计算内容的注释/字符串掩码，非代码位置为1
+    不支持的语言返回None（全部视为代码）
+    """
+    lexer = _get_lexer(language)
+    if lexer is None:
+        return None
+    regex, rules = lexer
+
+    mask = bytearray(len(content))
+    for match in regex.finditer(content):
+        kind, markers = rules[match.lastindex - 1]
+        start, end = match.span()
+        mask[start:end] = b'\x01' * (end - start)
+        if markers and kind == 'string':
+            # 只有 f 字符串中的 {} 是插值
+            if language == 'python' and not _PYTHON_FSTRING_PREFIX.search(content[max(0, start - 3):start]):
+                continue
+            # 插值表达式是代码，取消标记，只保留前后字面文本的标记
+            for span_start, span_end in _interpolation_spans(match.group(), markers):
+                mask[start + span_start:start + span_end] = bytes(span_end - span_start)
+    return mask
@@ -0,0 +1,126 @@
+"""
+文本分析用的行号/所在函数索引
+
+记录换行符的偏移量表，并按块用 finditer 找出函数定义所在的行，
+之后每个命中通过 bisect 得到行号和所在函数，不需要逐行处理。
+
+各语言的函数定义正则在压缩后的超长行上可能出现灾难性回溯，因此识别函数定义时：
+- 超过 MAX_LINE_LENGTH 的行不使用函数定义正则，改用线性时间的关键字匹配（FALLBACK_FUNCTION_PATTERN）
+- 按 BLOCK_SIZE 分块（块边界对齐到行尾）匹配，每块之前检查单个文件的时间预算，超出后剩余内容也改用关键字匹配
+两种情况都会记录在 long_lines / time_budget_exceeded 中，由调用方作为降级扫描报告。
+"""
+import re
+import time
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Match, Optional, Pattern
+
+_NEWLINE = re.compile('\n')
+
+# 超过该长度的行视为超长行
+MAX_LINE_LENGTH = 4096
+
+# 单个文件识别函数定义的时间预算（秒）
+FUNCTION_TIME_BUDGET = 10.0
+
+# 每次匹配的内容块大小，块之间检查时间预算
+BLOCK_SIZE = 65536
+
+# 行首开始的超长行（MULTILINE下只在行首尝试匹配，线性时间）
+_LONG_LINE = re.compile(r'^[^\n]{%d}' % (MAX_LINE_LENGTH + 1), re.MULTILINE)
+
+# 超长行和超时后使用的线性时间函数定义识别：只匹配以关键字开头的定义
+FALLBACK_FUNCTION_PATTERN = re.compile(r'\b(?:def|function|func|fn|fun)[^\S\n]+(\w+)')
+
+
+def line_local_pattern(pattern: str) -> str:
+    """
+    把逐行匹配用的函数定义正则改写为可以在整个文件上匹配、且不会跨行的形式：
+    取反字符集和 \\s 不再匹配换行符，$ 改为匹配行尾
+    """
+    pattern = pattern.replace('[^', '[^\\n')
+    pattern = re.sub(r'(?<!\\)\$', r'(?=\\n|\\Z)', pattern)
+    return pattern.replace('\\s', '[^\\S\\n]')
+
+
+def function_deadline() -> float:
+    """从现在开始计算的单个文件时间预算截止时间"""
+    return time.monotonic() + FUNCTION_TIME_BUDGET
+
+
+class LineIndex:
+    """单个文件（或按行边界切分的一段内容）的行号和所在函数索引"""
+
+    def __init__(self, content: str, function_regex: Pattern, initial_function: Optional[str] = "<module>",
+                 deadline: Optional[float] = None):
+        self.content = content
+        # 每个换行符的偏移量
+        self.newlines: List[int] = [match.start() for match in _NEWLINE.finditer(content)]
+
+        # 函数定义所在的行（从0开始）和函数名，每行只取第一个匹配，与逐行 re.search 的语义一致
+        self.function_lines: List[int] = []
+        self.function_names: List[Optional[str]] = []
+        self.initial_function = initial_function
+
+        # 降级扫描信息
+        self.long_lines = 0                 # 使用关键字匹配的超长行数
+        self.time_budget_exceeded = False   # 是否因超出时间预算而对剩余内容使用关键字匹配
+
+        self._index_functions(function_regex, function_deadline() if deadline is None else deadline)
+
+    def _index_functions(self, function_regex: Pattern, deadline: float):
+        content = self.content
+        size = len(content)
+        long_line_starts = [match.start() for match in _LONG_LINE.finditer(content)]
+        long_line_starts.append(size)
+
+        pos = 0
+        for long_start in long_line_starts:
+            # 普通行：按块使用函数定义正则，每块之前检查时间预算
+            while pos < long_start:
+                if time.monotonic() > deadline:
+                    self.time_budget_exceeded = True
+                    self._add_functions(FALLBACK_FUNCTION_PATTERN.finditer(content, pos))
+                    return
+                block_end = content.find('\n', pos + BLOCK_SIZE)
+                block_end = long_start if block_end == -1 or block_end >= long_start else block_end + 1
+                self._add_functions(function_regex.finditer(content, pos, block_end))
+                pos = block_end
+
+            # 超长行：使用关键字匹配
+            if long_start < size:
+                line_end = content.find('\n', long_start)
+                line_end = size if line_end == -1 else line_end
+                self.long_lines += 1
+                self._add_functions(FALLBACK_FUNCTION_PATTERN.finditer(content, long_start, line_end))
+                pos = line_end + 1
+
+    def _add_functions(self, matches: Iterable[Match]):
+        for match in matches:
+            line = bisect_left(self.newlines, match.start())
+            if self.function_lines and self.function_lines[-1] == line:
+                continue
+            self.function_lines.append(line)
+            self.function_names.append(match.group(1))
+
+    def line_of(self, pos: int) -> int:
+        """偏移量所在的行（从0开始）"""
+        return bisect_left(self.newlines, pos)
+
+    def line_start(self, line: int) -> int:
+        """行首的偏移量"""
+        return self.newlines[line - 1] + 1 if line > 0 else 0
+
+    def line_text(self, line: int) -> str:
+        """行的内容（不含换行符）"""
+        end = self.newlines[line] if line < len(self.newlines) else len(self.content)
+        return self.content[self.line_start(line):end]
+
+    def function_at(self, line: int) -> Optional[str]:
+        """行所在的函数：该行及之前最后一个函数定义，没有时为 initial_function"""
+        i = bisect_right(self.function_lines, line)
+        return self.function_names[i - 1] if i else self.initial_function
+
+    @property
+    def last_function(self) -> Optional[str]:
+        """内容末尾所在的函数，用于分段处理时传给下一段"""
+        return self.function_names[-1] if self.function_names else self.initial_function
@@ -0,0 +1,225 @@
+"""
+保存在SQLite数据库中的分析结果
+
+与按时间戳保存的 analysis_result_*.json 不同，数据库在多次运行之间累积：
+每个服务器分析完成后，在一个事务中替换该服务器的全部行，只分析了部分服务器
+（--shard、--max-servers、增量分析）的运行也可以合并到同一个数据库中。
+
+表结构：
+    servers            服务器 -> 项目语言、对应仓库、最近一次分析时间
+    repos              仓库 -> 星星数
+    server_categories  服务器 -> 该服务器为所属仓库添加的类别（按元数据中的顺序）
+    rules              (语言, API名称) -> 描述、威胁类型、资源类型、规则集版本
+    findings           每个API调用一行，按服务器、威胁类型、资源类型建立索引
+
+仓库的类别列表由数据库中对应该仓库的所有服务器的类别拼接而成（与单机运行时按服务器逐个追加相同），
+因此只分析了部分服务器的运行不会覆盖其他服务器为同一仓库添加的类别。
+
+威胁类型统计 (threat_analyzer.py) 和安全统计表直接对数据库做SQL聚合查询，不必重新加载JSON文件。
+"""
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, Mapping, Sequence, Set, Tuple
+
+RESULTS_DB_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS servers (
+    name TEXT PRIMARY KEY,
+    language TEXT NOT NULL,
+    repo TEXT,
+    scanned_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS repos (
+    name TEXT PRIMARY KEY,
+    stars INTEGER
+);
+CREATE TABLE IF NOT EXISTS server_categories (
+    server TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (server, position)
+);
+CREATE TABLE IF NOT EXISTS rules (
+    language TEXT NOT NULL,
+    api_name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    threat_type TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    ruleset_version TEXT NOT NULL,
+    PRIMARY KEY (language, api_name)
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    server TEXT NOT NULL,
+    language TEXT,
+    path TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    "column" INTEGER NOT NULL,
+    api_call TEXT NOT NULL,
+    function TEXT NOT NULL,
+    description TEXT NOT NULL,
+    threat_type TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    generated TEXT
+);
+CREATE INDEX IF NOT EXISTS findings_server ON findings (server);
+CREATE INDEX IF NOT EXISTS findings_threat_type ON findings (threat_type, server);
+CREATE INDEX IF NOT EXISTS findings_resource_type ON findings (resource_type, server);
+CREATE INDEX IF NOT EXISTS servers_repo ON servers (repo);
+"""
+
+
+class ResultsDB:
+    """保存在SQLite数据库中的分析结果"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self._conn = sqlite3.connect(db_path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def save_rules(self, language: str, rules: Mapping[str, Any], ruleset_version: str):
+        """替换某种语言的规则表（rules 为 API名称 -> RuleInfo）"""
+        with self._conn:
+            self._conn.execute("DELETE FROM rules WHERE language = ?", (language,))
+            self._conn.executemany(
+                "INSERT INTO rules (language, api_name, description, threat_type, resource_type, ruleset_version) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(language, api_name, rule.description, rule.threat_type, rule.resource_type, ruleset_version)
+                 for api_name, rule in rules.items()]
+            )
+
+    def save_repo_metadata(self, repo_stars: Mapping[str, Any]):
+        """更新仓库的星星数（只更新本次运行加载到元数据的仓库）"""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO repos (name, stars) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET stars = COALESCE(excluded.stars, stars)",
+                [(repo, int(stars) if stars is not None else None) for repo, stars in repo_stars.items()]
+            )
+
+    def replace_server(self, server_name: str, language: str, repo: str, categories: Sequence[str],
+                       api_calls: Iterable[Dict[str, Any]]):
+        """在一个事务中用本次的分析结果和该服务器为所属仓库添加的类别替换服务器的全部行"""
+        rows = [
+            (server_name, api_call_info.get("language"), api_call_info["path"], api_call_info["line"],
+             api_call_info["column"], api_call_info["api_call"], api_call_info["function"],
+             api_call_info["description"], api_call_info["threat_type"], api_call_info["resource_type"],
+             api_call_info.get("generated"))
+            for api_call_info in api_calls
+        ]
+        with self._conn:
+            self._conn.execute("DELETE FROM findings WHERE server = ?", (server_name,))
+            self._conn.execute("DELETE FROM server_categories WHERE server = ?", (server_name,))
+            self._conn.executemany(
+                "INSERT INTO server_categories (server, position, category) VALUES (?, ?, ?)",
+                [(server_name, position, category) for position, category in enumerate(categories)]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO servers (name, language, repo, scanned_at) VALUES (?, ?, ?, ?)",
+                (server_name, language, repo, datetime.now().isoformat(timespec='seconds'))
+            )
+            self._conn.executemany(
+                'INSERT INTO findings (server, language, path, line, "column", api_call, function, description, '
+                'threat_type, resource_type, generated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+    def threat_statistics(self) -> Tuple[Dict[str, int], Dict[str, Set[str]], Dict[str, Dict[str, int]]]:
+        """
+        按威胁类型统计受影响的服务器
+
+        Returns:
+            tuple: (威胁类型 -> 服务器数, 威胁类型 -> 服务器集合, 威胁类型 -> {服务器语言 -> 服务器数})
+        """
+        servers_by_threat = {}
+        for threat_type, server_name in self._conn.execute(
+                "SELECT DISTINCT threat_type, server FROM findings ORDER BY threat_type, server"):
+            servers_by_threat.setdefault(threat_type, set()).add(server_name)
+        threat_counts = {threat_type: len(servers) for threat_type, servers in servers_by_threat.items()}
+
+        language_by_threat = {}
+        for threat_type, language, server_count in self._conn.execute(
+                """
+                SELECT f.threat_type, COALESCE(s.language, 'Unknown'), COUNT(DISTINCT f.server)
+                FROM findings f LEFT JOIN servers s ON s.name = f.server
+                GROUP BY f.threat_type, COALESCE(s.language, 'Unknown')
+                """):
+            language_by_threat.setdefault(threat_type, {})[language] = server_count
+        return threat_counts, servers_by_threat, language_by_threat
+
+    def count_servers_with_findings(self) -> int:
+        return self._conn.execute("SELECT COUNT(DISTINCT server) FROM findings").fetchone()[0]
+
+    def security_table_stats(self, star_edges: Sequence[int], star_range_labels: Sequence[str], default_category: str):
+        """
+        用SQL聚合计算安全统计表的数据：只统计有API调用、且对应仓库有星星数的服务器
+
+        Returns:
+            tuple: (类别 -> 统计, 星星数范围 -> 统计, 所有资源类型, 跳过的服务器数)，
+                   统计的格式为 {'total': 服务器数, 'server_count': 服务器数, 'resource_types': {资源类型 -> 服务器数}}
+        """
+        # 星星数范围：star_edges 为各范围的上界（包含），与 threat_cube.star_buckets 相同
+        bucket_cases = " ".join(f"WHEN r.stars <= {int(edge)} THEN {index}" for index, edge in enumerate(star_edges))
+        scanned = f"""
+            WITH scanned AS (
+                SELECT s.name AS server, s.repo AS repo, CASE {bucket_cases} ELSE {len(star_edges)} END AS bucket
+                FROM servers s JOIN repos r ON r.name = s.repo
+                WHERE r.stars IS NOT NULL AND EXISTS (SELECT 1 FROM findings f WHERE f.server = s.name)
+            ),
+            server_resource_types AS (
+                SELECT DISTINCT server, resource_type FROM findings
+            ),
+            repo_category_rows AS (
+                SELECT s.repo AS repo, c.category AS category
+                FROM servers s JOIN server_categories c ON c.server = s.name
+            ),
+            scanned_categories AS (
+                SELECT scanned.server AS server, COALESCE(rc.category, ?) AS category
+                FROM scanned LEFT JOIN repo_category_rows rc ON rc.repo = scanned.repo
+            )
+        """
+
+        def empty_stats():
+            return {'total': 0, 'resource_types': {}, 'server_count': 0}
+
+        category_stats = {}
+        for category, server_count in self._conn.execute(
+                scanned + "SELECT category, COUNT(*) FROM scanned_categories GROUP BY category", (default_category,)):
+            stats = category_stats[category] = empty_stats()
+            stats['total'] = stats['server_count'] = server_count
+        for category, resource_type, server_count in self._conn.execute(
+                scanned + """
+                SELECT sc.category, srt.resource_type, COUNT(*)
+                FROM scanned_categories sc JOIN server_resource_types srt ON srt.server = sc.server
+                GROUP BY sc.category, srt.resource_type
+                """, (default_category,)):
+            category_stats[category]['resource_types'][resource_type] = server_count
+
+        star_range_stats = {label: empty_stats() for label in star_range_labels}
+        for bucket, server_count in self._conn.execute(
+                scanned + "SELECT bucket, COUNT(*) FROM scanned GROUP BY bucket", (default_category,)):
+            stats = star_range_stats[star_range_labels[bucket]]
+            stats['total'] = stats['server_count'] = server_count
+        for bucket, resource_type, server_count in self._conn.execute(
+                scanned + """
+                SELECT scanned.bucket, srt.resource_type, COUNT(*)
+                FROM scanned JOIN server_resource_types srt ON srt.server = scanned.server
+                GROUP BY scanned.bucket, srt.resource_type
+                """, (default_category,)):
+            star_range_stats[star_range_labels[bucket]]['resource_types'][resource_type] = server_count
+
+        all_resource_types = {row[0] for row in self._conn.execute("SELECT DISTINCT resource_type FROM findings")}
+        skipped_servers = self.count_servers_with_findings() - sum(
+            stats['server_count'] for stats in star_range_stats.values())
+        return category_stats, star_range_stats, all_resource_types, skipped_servers
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
@@ -0,0 +1,106 @@
+"""
+按服务器记录的扫描检查点日志
+
+每个服务器分析完成后，立即把它的分析结果和统计信息追加写入JSON Lines日志并刷新到磁盘。
+扫描中途崩溃或被终止后，使用 --resume 重新运行时跳过日志中已完成的服务器，只分析剩余的服务器，
+最后用日志中的结果和新的结果一起生成报告。
+
+第一行是头部信息，之后每行对应一个已完成的服务器：
+    {"journal_version": 1, "ruleset_version": ..., "shard": [i, N] 或 null}
+    {"server": ..., "results": {语言: [分析结果, ...]}, "read_stats": {...}, "generated": {...}, "degraded_scans": [...]}
+
+最后一行可能因为进程被终止而不完整，读取时丢弃，继续写入前先截掉这部分内容。
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+JOURNAL_VERSION = 1
+
+
+class ScanJournal:
+    """只追加写入的服务器检查点日志"""
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+        self._file = None
+        self._valid_size = 0  # 最后一条完整记录的结束位置
+
+    def load(self, ruleset_version: str, shard: Optional[List[int]] = None) -> Dict[str, int]:
+        """
+        读取日志中已完成的服务器，返回 {服务器名称 -> 记录在日志中的偏移量}，记录本身用 read 按需读取，
+        不在内存中同时保留所有服务器的结果
+        日志不存在，或者规则集版本、分片与本次运行不一致时返回空字典（需要重新开始）
+        """
+        self._valid_size = 0
+        if not os.path.exists(self.journal_path):
+            return {}
+
+        offsets = {}
+        with open(self.journal_path, 'rb') as f:
+            header_line = f.readline()
+            try:
+                header = json.loads(header_line)
+            except ValueError:
+                print(f"警告: 检查点日志 {self.journal_path} 的头部无效，重新开始扫描")
+                return {}
+            if header.get('journal_version') != JOURNAL_VERSION or header.get('ruleset_version') != ruleset_version \
+                    or header.get('shard') != shard:
+                print(f"警告: 检查点日志 {self.journal_path} 与本次运行的规则集或分片不一致，重新开始扫描")
+                return {}
+
+            valid_size = len(header_line)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # 写入中途被终止的记录
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                offsets[record['server']] = valid_size
+                valid_size += len(line)
+        self._valid_size = valid_size
+        return offsets
+
+    def read(self, offset: int) -> Dict[str, Any]:
+        """读取 load 返回的偏移量处的一条记录（继续追加写入不会改变已有的完整记录）"""
+        with open(self.journal_path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def open(self, ruleset_version: str, shard: Optional[List[int]] = None, resume: bool = False):
+        """打开日志准备写入：resume 时在已读取的完整记录之后继续追加，否则清空日志重新开始"""
+        journal_dir = os.path.dirname(os.path.abspath(self.journal_path))
+        if not os.path.exists(journal_dir):
+            os.makedirs(journal_dir)
+
+        if resume and self._valid_size:
+            self._file = open(self.journal_path, 'r+b')
+            self._file.truncate(self._valid_size)
+            self._file.seek(self._valid_size)
+        else:
+            self._file = open(self.journal_path, 'wb')
+            header = {'journal_version': JOURNAL_VERSION, 'ruleset_version': ruleset_version, 'shard': shard}
+            self._write_line(header)
+
+    def append(self, server_name: str, language_results: Dict[str, List[Dict[str, Any]]], read_stats: Dict[str, int],
+               generated: Dict[str, int], degraded_scans: List[Dict[str, Any]]):
+        """记录一个已完成的服务器"""
+        self._write_line({
+            'server': server_name,
+            'results': language_results,
+            'read_stats': read_stats,
+            'generated': generated,
+            'degraded_scans': degraded_scans
+        })
+
+    def _write_line(self, record: Dict[str, Any]):
+        # 分析结果（Finding）按字典格式写入；每条记录都刷新到磁盘，进程随时被终止也不会丢失已完成的服务器
+        self._file.write((json.dumps(record, ensure_ascii=False, default=dict) + '\n').encode('utf-8'))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,121 @@
+"""
+源码文件读取
+
+- 通过文件头的魔数和NUL字节密度识别二进制文件（如 .jar、.rlib），直接跳过
+- 超过阈值的大文件使用 mmap 映射，按行边界分段解码后分析，不构建完整的 str 副本
+- 每个文件的读取结果（文本 / mmap / 二进制 / 解码失败）由调用方计入运行报告
+"""
+import codecs
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple, Union
+
+# 超过该大小的文件使用 mmap 读取
+MMAP_THRESHOLD = 1 << 20
+
+# 用于识别二进制文件的文件头长度（与 git 判断二进制文件时检查的长度相同）
+SNIFF_SIZE = 8000
+
+# NUL字节占比超过该值时视为二进制文件
+NUL_RATIO = 0.01
+
+# 常见二进制格式的魔数
+BINARY_MAGIC = (
+    b'PK\x03\x04',        # zip / jar / whl
+    b'!<arch>\n',         # ar 归档（Rust的 .rlib、静态库）
+    b'\x7fELF',           # ELF可执行文件
+    b'\xca\xfe\xba\xbe',  # Java class / Mach-O fat
+    b'\xcf\xfa\xed\xfe',  # Mach-O 64
+    b'\x1f\x8b',          # gzip
+    b'\x89PNG',           # PNG
+    b'\x00asm',           # WebAssembly
+    b'%PDF',              # PDF
+)
+
+# 读取结果
+READ_TEXT = 'text'
+READ_MMAP = 'mmap'
+READ_BINARY = 'binary'
+READ_DECODE_ERROR = 'decode_error'
+
+
+def is_binary(head: bytes) -> bool:
+    """根据文件头判断是否是二进制文件"""
+    if head.startswith(BINARY_MAGIC):
+        return True
+    return bool(head) and head.count(b'\x00') / len(head) > NUL_RATIO
+
+
+def is_valid_utf8(data: Union[bytes, mmap.mmap], chunk_size: int = MMAP_THRESHOLD) -> bool:
+    """分块检查内容是否是合法的UTF-8，不构建完整的 str"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for start in range(0, len(data), chunk_size):
+            decoder.decode(data[start:start + chunk_size])
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _has_lone_cr(data: mmap.mmap) -> bool:
+    """是否存在不属于 \\r\\n 的单独 \\r（旧Mac换行符），这种文件按行处理时需要完整解码"""
+    pos = data.find(b'\r')
+    while pos != -1:
+        if data[pos + 1:pos + 2] != b'\n':
+            return True
+        pos = data.find(b'\r', pos + 2)
+    return False
+
+
+@contextmanager
+def open_source(path: str, mmap_threshold: int = MMAP_THRESHOLD) -> Iterator[Tuple[str, Optional[Union[bytes, mmap.mmap]]]]:
+    """
+    打开源码文件，返回 (读取结果, 内容)
+
+    - READ_TEXT: 内容为完整读取的 bytes
+    - READ_MMAP: 内容为只读 mmap（已确认是合法的UTF-8），退出上下文时关闭
+    - READ_BINARY / READ_DECODE_ERROR: 内容为None
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        head = f.read(SNIFF_SIZE)
+        if is_binary(head):
+            yield READ_BINARY, None
+            return
+
+        if size <= mmap_threshold:
+            yield READ_TEXT, head + f.read()
+            return
+
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if not is_valid_utf8(data):
+                yield READ_DECODE_ERROR, None
+            elif _has_lone_cr(data):
+                yield READ_TEXT, data[:]
+            else:
+                yield READ_MMAP, data
+        finally:
+            data.close()
+
+
+def iter_text_chunks(data: mmap.mmap, chunk_size: int = MMAP_THRESHOLD) -> Iterator[Tuple[int, str]]:
+    """
+    按行边界把 mmap 切分为若干段并解码，返回 (段首行号（从0开始）, 内容)
+    每段约 chunk_size 字节，换行符统一为 \\n，与完整解码后的内容逐行一致
+    """
+    offset = 0
+    line_offset = 0
+    size = len(data)
+    while offset < size:
+        end = size
+        if offset + chunk_size < size:
+            newline = data.find(b'\n', offset + chunk_size)
+            if newline != -1:
+                end = newline + 1
+        text = str(data[offset:end], 'utf-8').replace('\r\n', '\n')
+        yield line_offset, text
+        line_offset += text.count('\n')
+        offset = end
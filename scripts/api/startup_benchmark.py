@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+命令行工具启动时间的回归基准
+
+多次运行各工具的 --help 并统计启动耗时的中位数，同时检查导入分析模块时没有加载
+pandas、requests、matplotlib 等重量级依赖（它们只应在读取Excel、获取星星数和生成图表时加载）。
+任一工具超过时间上限或加载了重量级依赖时以非零状态退出，可以直接放在任务脚本中作为检查。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import List, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 不应在导入时加载的重量级依赖
+HEAVY_MODULES = ('pandas', 'requests', 'matplotlib', 'numpy')
+
+# 需要检查启动时间的命令行工具
+CLI_COMMANDS = [
+    ('analyzer.py', ['--help']),
+    ('analyze_threats.py', ['--help']),
+]
+
+# 需要检查导入开销的模块
+IMPORT_MODULES = ['analyzer', 'threat_analyzer']
+
+
+def measure_startup(script: str, args: List[str], runs: int) -> Tuple[float, int]:
+    """运行命令 runs 次，返回 (启动耗时的中位数（秒）, 最后一次的退出状态)"""
+    timings = []
+    returncode = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, script), *args], cwd=SCRIPT_DIR,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+        returncode = result.returncode
+    return statistics.median(timings), returncode
+
+
+def heavy_modules_loaded(module: str) -> List[str]:
+    """在新进程中导入模块，返回被一同加载的重量级依赖"""
+    code = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=SCRIPT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败: {result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='命令行工具启动时间的回归基准')
+    parser.add_argument('--runs', type=int, default=5, help='每个命令的运行次数 (默认: 5)')
+    parser.add_argument('--max-seconds', type=float, default=1.0,
+                        help='启动耗时中位数的上限（秒），超过时视为回归 (默认: 1.0)')
+    args = parser.parse_args()
+
+    failed = False
+
+    print("启动耗时（中位数）:")
+    for script, script_args in CLI_COMMANDS:
+        elapsed, returncode = measure_startup(script, script_args, args.runs)
+        status = "OK"
+        if returncode != 0:
+            status = f"退出状态 {returncode}"
+            failed = True
+        elif elapsed > args.max_seconds:
+            status = f"超过上限 {args.max_seconds:.2f}s"
+            failed = True
+        print(f"  - {script} {' '.join(script_args)}: {elapsed:.3f}s ({status})")
+
+    print("\n导入时加载的重量级依赖:")
+    for module in IMPORT_MODULES:
+        loaded = heavy_modules_loaded(module)
+        if loaded:
+            failed = True
+        print(f"  - {module}: {', '.join(loaded) if loaded else '无'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
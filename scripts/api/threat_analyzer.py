@@ -1,16 +1,27 @@
 import os
 import sys
-import matplotlib.pyplot as plt
 from datetime import datetime
 from collections import defaultdict, Counter
 from typing import Dict, List, Set, Any
-import matplotlib
-import matplotlib.font_manager as fm
 # 添加缺失的json模块导入
 import json
-# 设置matplotlib支持中文显示
-matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'SimSun', 'KaiTi', 'FangSong', 'Arial Unicode MS']
-matplotlib.rcParams['axes.unicode_minus'] = False  # 解决保存图像时负号'-'显示为方块的问题
+from findings_columns import summarize_servers
+from results_db import RESULTS_DB_SUFFIXES, ResultsDB
+
+# matplotlib 的导入和字体缓存的构建耗时较长，只在生成图表时加载
+_pyplot = None
+
+def _load_pyplot():
+    """导入 matplotlib 并设置中文显示（只在第一次调用时执行），返回 pyplot 模块"""
+    global _pyplot
+    if _pyplot is None:
+        import matplotlib
+        import matplotlib.pyplot as plt
+        # 设置matplotlib支持中文显示
+        matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'SimSun', 'KaiTi', 'FangSong', 'Arial Unicode MS']
+        matplotlib.rcParams['axes.unicode_minus'] = False  # 解决保存图像时负号'-'显示为方块的问题
+        _pyplot = plt
+    return _pyplot
 
 def check_chinese_font_available():
     """
@@ -24,6 +35,7 @@ def check_chinese_font_available():
                      'WenQuanYi Micro Hei', 'WenQuanYi Zen Hei', 'Noto Sans CJK SC', 'Source Han Sans CN']
     
     # 获取系统字体列表
+    import matplotlib.font_manager as fm
     font_names = [f.name for f in fm.fontManager.ttflist]
     
     # 查找可用的中文字体
@@ -39,7 +51,8 @@ def analyze_threats(json_file_path: str) -> tuple[Dict[str, int], Dict[str, Set[
     分析JSON文件中的威胁类型
     
     Args:
-        json_file_path: JSON文件路径
+        json_file_path: JSON文件路径，也可以是 analyzer.py --columnar 按列保存的 .parquet / .npz 文件，
+                        或 analyzer.py --db 的结果数据库、保存结果时生成的 threat_cube_*.cube.npz
     
     Returns:
         tuple: (威胁类型计数, 每种威胁类型对应的服务器列表, 每种威胁类型下每种语言的服务器数量)
@@ -50,9 +63,29 @@ def analyze_threats(json_file_path: str) -> tuple[Dict[str, int], Dict[str, Set[
         sys.exit(1)
     
     try:
-        # 读取JSON文件
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if json_file_path.endswith(RESULTS_DB_SUFFIXES):
+            # 结果数据库直接用SQL聚合查询
+            results_db = ResultsDB(json_file_path)
+            try:
+                print(f"共有{results_db.count_servers_with_findings()}个服务器含有可能有威胁的代码")
+                return results_db.threat_statistics()
+            finally:
+                results_db.close()
+        
+        if json_file_path.endswith('.cube.npz'):
+            # 预聚合的威胁统计立方体，直接切片
+            from threat_cube import ThreatCube
+            cube = ThreatCube.load(json_file_path)
+            print(f"共有{cube.server_count()}个服务器含有可能有威胁的代码")
+            return cube.threat_statistics()
+        
+        if json_file_path.endswith(('.parquet', '.npz')):
+            # 按列保存的结果只加载服务器、语言和威胁类型三列
+            data = summarize_servers(json_file_path, ('threat_types',))
+        else:
+            # 读取JSON文件
+            with open(json_file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         
         # 初始化威胁类型计数器和服务器映射
         threat_counts = Counter()
@@ -96,6 +129,8 @@ def generate_chart(threat_counts: Dict[str, int], output_dir: str = './output')
     Returns:
         str: 图表文件路径
     """
+    plt = _load_pyplot()
+
     # 确保输出目录存在
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -109,7 +144,7 @@ def generate_chart(threat_counts: Dict[str, int], output_dir: str = './output')
     has_chinese_font, available_fonts = check_chinese_font_available()
     if has_chinese_font:
         # 设置找到的第一个中文字体
-        matplotlib.rcParams['font.sans-serif'] = [available_fonts[0]] + matplotlib.rcParams['font.sans-serif']
+        plt.rcParams['font.sans-serif'] = [available_fonts[0]] + plt.rcParams['font.sans-serif']
         print(f"使用中文字体: {available_fonts[0]}")
     else:
         print("警告: 系统中未找到中文字体，将使用英文显示")
@@ -0,0 +1,306 @@
+"""
+预聚合的威胁统计立方体
+
+在保存分析结果时一次性计算 (类别, 星星数范围, 语言, 威胁类型, 资源类型) 五个维度上的服务器数，
+安全统计表、威胁类型统计 (threat_analyzer.py)、CSV和图表都只是对立方体的切片求和，
+新的交叉统计不必重新加载JSON和逐个服务器重新汇总。
+
+一个服务器可以属于多个类别、涉及多种威胁类型和资源类型，对这三个多值维度直接求和会重复计数，
+因此它们各有一个汇总坐标 ALL：每个服务器除了计入自己的每个取值外，还在 ALL 上计一次。
+星星数范围和语言是单值维度，可以直接求和；没有对应仓库或星星数的服务器归入 NO_STARS 范围。
+
+用法：
+    python threat_cube.py threat_cube_20250506_114553.cube.npz --rows category --cols resource_type
+    python threat_cube.py threat_cube_20250506_114553.cube.npz --rows threat_type --cols language --csv out.csv
+"""
+import argparse
+import csv
+import json
+import sys
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+AXES = ('category', 'star_range', 'language', 'threat_type', 'resource_type')
+MULTI_VALUED_AXES = ('category', 'threat_type', 'resource_type')
+ALL = '*'
+NO_STARS = '无星星数'
+CUBE_SUFFIX = '.cube.npz'
+
+
+def star_buckets(star_counts, star_edges: Sequence[float]) -> np.ndarray:
+    """
+    计算星星数所属的范围编号：star_edges 为各范围的上界（包含），
+    星星数 <= star_edges[0] 为第0个范围，大于最后一个上界的为第 len(star_edges) 个范围
+    """
+    return np.digitize(np.asarray(star_counts, dtype=np.float64), np.asarray(star_edges, dtype=np.float64), right=True)
+
+
+def star_histogram(star_counts, star_edges: Sequence[float]) -> List[int]:
+    """统计落在各星星数范围内的数量（负数不计入），返回长度为 len(star_edges) + 1 的列表"""
+    star_counts = np.asarray(star_counts, dtype=np.float64)
+    buckets = star_buckets(star_counts[star_counts >= 0], star_edges)
+    return np.bincount(buckets, minlength=len(star_edges) + 1).tolist()
+
+
+def _pair_within_server(left_servers: np.ndarray, right_counts: np.ndarray, right_starts: np.ndarray):
+    """
+    左侧每一项与同一服务器在右侧的每一项配对（右侧按服务器连续存放）
+
+    Returns:
+        tuple: (左侧下标数组, 右侧下标数组)
+    """
+    repeats = right_counts[left_servers]
+    left = np.repeat(np.arange(len(left_servers)), repeats)
+    # 每组配对内的序号 0 .. repeats-1
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    return left, right_starts[left_servers][left] + offsets
+
+
+def _resolve_all(codes: np.ndarray, labels: List[str]) -> np.ndarray:
+    """把暂记为 -1 的 ALL 换算为最后一个标签的下标"""
+    return np.where(codes < 0, len(labels) - 1, codes)
+
+
+class ThreatCube:
+    """按五个维度统计服务器数的计数立方体"""
+
+    def __init__(self, labels: Dict[str, List[str]], counts: np.ndarray, servers_by_threat: Dict[str, List[str]]):
+        self.labels = labels          # 维度 -> 坐标标签（多值维度的最后一个标签为 ALL）
+        self.counts = counts          # 形状为各维度标签数的int64数组
+        self.servers_by_threat = servers_by_threat  # 威胁类型 -> 服务器名称列表（威胁类型统计需要列出服务器）
+
+    @classmethod
+    def build(cls, results: Mapping[str, Mapping[str, Any]], server_to_repo_mapping: Mapping[str, str],
+              repo_stars: Mapping[str, Any], repo_categories: Mapping[str, List[str]],
+              star_edges: Sequence[float], star_range_labels: Sequence[str],
+              default_category: str = '未分类') -> 'ThreatCube':
+        """
+        从按服务器归类的结果（analysis_result_*.json 的内容或流式输出的汇总）构建立方体
+
+        星星数范围由 star_edges 划分（见 star_buckets）；仓库没有类别记录时归入 default_category，
+        类别列表中重复的类别按出现次数计数。所有服务器的星星数范围用一次 np.digitize 计算，
+        多值维度展开后与服务器编号配对，最后用一次 bincount 完成分组计数
+        """
+        servers = list(results)
+        star_labels = list(star_range_labels) + [NO_STARS]
+        lookups = {axis: {} for axis in MULTI_VALUED_AXES + ('language',)}
+
+        # 星星数范围：没有对应仓库或星星数的服务器归入 NO_STARS
+        repos = [server_to_repo_mapping.get(server_name) for server_name in servers]
+        has_stars = np.array([bool(repo_name) and repo_name in repo_stars for repo_name in repos], dtype=bool)
+        star_counts = np.array([repo_stars[repo_name] if has else 0 for repo_name, has in zip(repos, has_stars)],
+                               dtype=np.float64)
+        buckets = np.where(has_stars, star_buckets(star_counts, star_edges), len(star_labels) - 1)
+
+        language_lookup = lookups['language']
+        languages = np.array([
+            language_lookup.setdefault(results[server_name].get("language", "Unknown"), len(language_lookup))
+            for server_name in servers
+        ], dtype=np.int64)
+
+        # 多值维度：每个服务器的取值列表末尾追加 ALL，展开为连续存放的编码
+        categories = cls._explode(lookups['category'],
+                                  [repo_categories.get(repo_name, [default_category]) for repo_name in repos])
+        threat_types = cls._explode(lookups['threat_type'],
+                                    [results[server_name].get("threat_types", {}) for server_name in servers])
+        resource_types = cls._explode(lookups['resource_type'],
+                                      [results[server_name].get("resource_types", {}) for server_name in servers])
+
+        servers_by_threat = {}
+        for server_name in servers:
+            for threat_type in results[server_name].get("threat_types", {}):
+                servers_by_threat.setdefault(threat_type, []).append(server_name)
+
+        labels = {'star_range': star_labels, 'language': list(language_lookup)}
+        for axis in MULTI_VALUED_AXES:
+            labels[axis] = list(lookups[axis]) + [ALL]
+        shape = tuple(len(labels[axis]) for axis in AXES)
+        if not servers:
+            return cls(labels, np.zeros(shape, dtype=np.int64), servers_by_threat)
+
+        # 同一服务器内 类别 × 威胁类型 × 资源类型 的所有组合
+        category_codes, category_counts, _ = categories
+        category_servers = np.repeat(np.arange(len(servers)), category_counts)
+        left, right = _pair_within_server(category_servers, threat_types[1], threat_types[2])
+        pair_servers = category_servers[left]
+        category_codes = category_codes[left]
+        threat_codes = threat_types[0][right]
+        left, right = _pair_within_server(pair_servers, resource_types[1], resource_types[2])
+        cell_servers = pair_servers[left]
+
+        cells = np.ravel_multi_index((
+            _resolve_all(category_codes[left], labels['category']),
+            buckets[cell_servers],
+            languages[cell_servers],
+            _resolve_all(threat_codes[left], labels['threat_type']),
+            _resolve_all(resource_types[0][right], labels['resource_type']),
+        ), shape)
+        counts = np.bincount(cells, minlength=int(np.prod(shape))).astype(np.int64).reshape(shape)
+        return cls(labels, counts, servers_by_threat)
+
+    @staticmethod
+    def _explode(lookup: Dict[str, int], value_lists: Sequence[Iterable[str]]):
+        """
+        把每个服务器的取值列表编码后依次连接（每个服务器末尾追加 ALL，暂记为 -1）
+
+        Returns:
+            tuple: (编码数组, 每个服务器的项数, 每个服务器第一项的位置)
+        """
+        codes = []
+        counts = np.empty(len(value_lists), dtype=np.int64)
+        for server_index, values in enumerate(value_lists):
+            start = len(codes)
+            codes.extend(lookup.setdefault(value, len(lookup)) for value in values)
+            codes.append(-1)
+            counts[server_index] = len(codes) - start
+        return np.array(codes, dtype=np.int64), counts, np.cumsum(counts) - counts
+
+    def save(self, path: str) -> str:
+        arrays = {f'{axis}_labels': np.array(self.labels[axis], dtype=str) for axis in AXES}
+        arrays['servers_by_threat'] = np.array(json.dumps(self.servers_by_threat, ensure_ascii=False))
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, counts=self.counts, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'ThreatCube':
+        with np.load(path, allow_pickle=False) as data:
+            labels = {axis: data[f'{axis}_labels'].tolist() for axis in AXES}
+            return cls(labels, data['counts'], json.loads(str(data['servers_by_threat'])))
+
+    def pivot(self, rows: str, cols: Optional[str] = None, **filters: Iterable[str]):
+        """
+        按一个或两个维度统计服务器数
+
+        未出现在 rows / cols 中的多值维度取 ALL，单值维度求和；
+        filters 为 维度 -> 保留的标签，多值维度只能作为行列或筛选单个标签，否则同一服务器会被重复计数
+
+        Returns:
+            dict: 行标签 -> 服务器数；指定 cols 时为 行标签 -> {列标签 -> 服务器数}
+        """
+        filters = {axis: list(values) for axis, values in filters.items()}
+        selections = []
+        for axis in AXES:
+            labels = self.labels[axis]
+            selected = [index for index, label in enumerate(labels) if label != ALL]
+            if axis in filters:
+                selected = [index for index in selected if labels[index] in filters[axis]]
+                if axis in MULTI_VALUED_AXES and axis not in (rows, cols) and len(selected) > 1:
+                    raise ValueError(f"多值维度 {axis} 只能筛选一个取值")
+            elif axis not in (rows, cols) and axis in MULTI_VALUED_AXES:
+                selected = [len(labels) - 1]
+            selections.append(selected)
+
+        kept = [AXES.index(rows)] + ([AXES.index(cols)] if cols else [])
+        sub = self.counts[np.ix_(*selections)].sum(axis=tuple(i for i in range(len(AXES)) if i not in kept))
+        row_labels = [self.labels[rows][index] for index in selections[AXES.index(rows)]]
+        if not cols:
+            return dict(zip(row_labels, sub.tolist()))
+        if kept[0] > kept[1]:
+            # 求和后的数组按 AXES 的顺序排列维度，行维度在后时需要转置
+            sub = sub.T
+        col_labels = [self.labels[cols][index] for index in selections[AXES.index(cols)]]
+        return {row_label: dict(zip(col_labels, row)) for row_label, row in zip(row_labels, sub.tolist())}
+
+    def server_count(self) -> int:
+        """立方体中的服务器总数"""
+        return int(sum(self.pivot('star_range').values()))
+
+    def security_table_stats(self, star_range_labels: Sequence[str]):
+        """
+        安全统计表的数据：只统计有对应仓库和星星数的服务器
+
+        Returns:
+            tuple: (类别 -> 统计, 星星数范围 -> 统计, 所有资源类型, 跳过的服务器数)，
+                   统计的格式为 {'total': 服务器数, 'server_count': 服务器数, 'resource_types': {资源类型 -> 服务器数}}
+        """
+        ranges = list(star_range_labels)
+
+        def stats(totals, resource_counts):
+            return {
+                label: {'total': total, 'server_count': total, 'resource_types': resource_counts.get(label, {})}
+                for label, total in totals.items()
+            }
+
+        category_stats = stats(self.pivot('category', star_range=ranges),
+                               self.pivot('category', 'resource_type', star_range=ranges))
+        star_range_stats = stats(self.pivot('star_range', star_range=ranges),
+                                 self.pivot('star_range', 'resource_type', star_range=ranges))
+        all_resource_types = {label for label in self.labels['resource_type'] if label != ALL}
+        skipped_servers = self.pivot('star_range', star_range=[NO_STARS]).get(NO_STARS, 0)
+        return category_stats, star_range_stats, all_resource_types, skipped_servers
+
+    def threat_statistics(self) -> Tuple[Dict[str, int], Dict[str, Set[str]], Dict[str, Dict[str, int]]]:
+        """
+        按威胁类型统计受影响的服务器
+
+        Returns:
+            tuple: (威胁类型 -> 服务器数, 威胁类型 -> 服务器集合, 威胁类型 -> {服务器语言 -> 服务器数})
+        """
+        threat_counts = {threat_type: count for threat_type, count in self.pivot('threat_type').items() if count}
+        language_by_threat = {
+            threat_type: {language: count for language, count in language_counts.items() if count}
+            for threat_type, language_counts in self.pivot('threat_type', 'language').items()
+        }
+        servers_by_threat = {threat_type: set(servers) for threat_type, servers in self.servers_by_threat.items()}
+        return threat_counts, servers_by_threat, language_by_threat
+
+    def write_csv(self, path: str, rows: str, cols: Optional[str] = None, **filters: Iterable[str]) -> str:
+        """把 pivot 的结果写成CSV文件"""
+        table = self.pivot(rows, cols, **filters)
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            if cols:
+                col_labels = list(next(iter(table.values()), {}))
+                writer.writerow([rows] + col_labels)
+                for row_label, row in table.items():
+                    writer.writerow([row_label] + [row[col_label] for col_label in col_labels])
+            else:
+                writer.writerow([rows, 'servers'])
+                for row_label, count in table.items():
+                    writer.writerow([row_label, count])
+        return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对预聚合的威胁统计立方体做交叉统计')
+    parser.add_argument('cube_file', help='analyzer.py 保存的 threat_cube_*.cube.npz 文件')
+    parser.add_argument('--rows', choices=AXES, required=True, help='行维度')
+    parser.add_argument('--cols', choices=AXES, help='列维度 (默认: 只统计行维度)')
+    parser.add_argument('--filter', action='append', default=[], metavar='维度=标签',
+                        help='只统计指定标签，可重复，例如 --filter star_range=0-10 --filter star_range=11-100')
+    parser.add_argument('--csv', help='保存为CSV文件 (默认: 打印到终端)')
+    args = parser.parse_args()
+
+    filters = {}
+    for item in args.filter:
+        axis, _, label = item.partition('=')
+        if axis not in AXES:
+            print(f"错误: 未知的维度 {axis}")
+            sys.exit(1)
+        filters.setdefault(axis, []).append(label)
+
+    cube = ThreatCube.load(args.cube_file)
+    try:
+        if args.csv:
+            cube.write_csv(args.csv, args.rows, args.cols, **filters)
+            print(f"交叉统计已保存到: {args.csv}")
+            return
+        table = cube.pivot(args.rows, args.cols, **filters)
+    except ValueError as e:
+        print(f"错误: {str(e)}")
+        sys.exit(1)
+
+    if args.cols:
+        col_labels = list(next(iter(table.values()), {}))
+        print('\t'.join([args.rows] + col_labels))
+        for row_label, row in table.items():
+            print('\t'.join([row_label] + [str(row[col_label]) for col_label in col_labels]))
+    else:
+        for row_label, count in table.items():
+            print(f"{row_label}\t{count}")
+
+
+if __name__ == '__main__':
+    main()
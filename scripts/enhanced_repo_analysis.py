@@ -8,10 +8,14 @@ from collections import defaultdict, Counter
 from pathlib import Path
 import xml.etree.ElementTree as ET
 import tomli  # 用于解析Cargo.toml
+from file_inventory import is_stale, read_manifest
 from typing import Dict, List, Set, Tuple, Optional
 
 class EnhancedRepoAnalyzer:
     def __init__(self):
+        # file_inventory.py 生成的文件清单 {仓库路径 -> 清单记录}，为None时直接遍历目录
+        self.manifest = None
+
         # 支持的语言和对应的依赖文件模式
         # 修改LANGUAGE_PATTERNS配置，支持多种Python依赖文件格式
         self.LANGUAGE_PATTERNS = {
@@ -233,11 +237,42 @@ class EnhancedRepoAnalyzer:
             }
         }
 
+    def load_manifest(self, manifest_path: str, repos_dir: str, verify_files: bool = False):
+        """
+        加载文件清单，之后的分析直接使用清单中的文件列表，不再遍历仓库目录
+
+        分析需要看到全部文件（与 os.walk 相同，包括依赖和构建目录），因此只接受
+        file_inventory.py --layout flat --no-exclude 为 repos_dir 生成的清单，不一致时抛出ValueError；
+        生成清单之后文件列表有变化的仓库不使用清单，仍然遍历目录（verify_files 见 file_inventory.is_stale）
+        """
+        servers = read_manifest(manifest_path, base_dir=repos_dir, excluded_dirs=set(), layout='flat')
+        self.manifest = {os.path.normpath(server.path): server for server in servers
+                         if not is_stale(server, verify_files)}
+        print(f"从文件清单加载了 {len(self.manifest)} 个仓库: {manifest_path}")
+        if len(self.manifest) < len(servers):
+            print(f"{len(servers) - len(self.manifest)} 个仓库在生成清单之后有变化，改为直接遍历目录")
+
+    def _walk_repo(self, repo_path: Path):
+        """遍历仓库中的文件，返回值与 os.walk 相同；加载了文件清单时直接使用清单"""
+        server = self.manifest.get(os.path.normpath(os.path.abspath(str(repo_path)))) if self.manifest else None
+        if server is None:
+            yield from os.walk(repo_path)
+            return
+
+        # 清单中同一目录的文件是连续的，按目录分组
+        files_by_dir = {}
+        for file_entry in server.files:
+            rel_dir, file_name = os.path.split(file_entry.path)
+            files_by_dir.setdefault(rel_dir, []).append(file_name)
+        for rel_dir, files in files_by_dir.items():
+            root = os.path.join(str(repo_path), rel_dir) if rel_dir else str(repo_path)
+            yield root, [], files
+
     def detect_language(self, repo_path: Path) -> str:
         """检测仓库的主要编程语言"""
         language_counts = defaultdict(int)
         # 通过文件扩展名检测
-        for root, _, files in os.walk(repo_path):
+        for root, _, files in self._walk_repo(repo_path):
             for file in files:
                 ext = Path(file).suffix.lower()
                 language = self.LANGUAGE_EXTENSIONS.get(ext)
@@ -732,7 +767,7 @@ class EnhancedRepoAnalyzer:
             elif language == 'Java':
                 # 查找Java的主类文件
                 java_files = []
-                for root, _, files in os.walk(repo_path):
+                for root, _, files in self._walk_repo(repo_path):
                     for file in files:
                         if file.endswith('.java') and 'Main' in file:
                             java_files.append(Path(root) / file)
@@ -795,7 +830,7 @@ class EnhancedRepoAnalyzer:
                             print(f"解析文件 {dep_file} 时出错: {str(e) or repr(e)}")
                     
                     # 尝试在子目录中查找依赖文件
-                    for root, _, files in os.walk(repo_path):
+                    for root, _, files in self._walk_repo(repo_path):
                         if file_config['file'] in files and root != repo_path:
                             dep_file = Path(root) / file_config['file']
                             try:
@@ -839,7 +874,7 @@ class EnhancedRepoAnalyzer:
         
         print(f"开始分析仓库，目录: {repos_dir}")
         
-        # 获取仓库列表
+        # 获取仓库列表（加载了文件清单时也列出 repos_dir，清单只提供各仓库的文件列表）
         repo_paths = []
         for item in os.listdir(repos_dir):
             item_path = os.path.join(repos_dir, item)
@@ -1104,6 +1139,10 @@ def main():
                               help='输出结果的目录路径')
     analyze_parser.add_argument('--min-count', type=int, default=1, 
                               help='最小统计次数，低于此值的库将被过滤')
+    analyze_parser.add_argument('--manifest', type=str,
+                              help='file_inventory.py --layout flat --no-exclude 为仓库目录生成的文件清单路径，指定后不再遍历仓库目录')
+    analyze_parser.add_argument('--verify-manifest', action='store_true',
+                              help='除目录的修改时间外，还逐个检查清单中文件的大小和修改时间 (默认: 只检查目录)')
     
     args = parser.parse_args()
     
@@ -1130,6 +1169,12 @@ def main():
             print(f"错误：仓库目录不存在: {args.repo_dir}")
             return
         
+        if args.manifest:
+            try:
+                analyzer.load_manifest(args.manifest, args.repo_dir, args.verify_manifest)
+            except ValueError as e:
+                print(f"错误：{e}")
+                return
         analyzer.run_analysis(args.repo_dir, args.output_dir, args.min_count)
     
     else:
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+生成MCP服务器仓库的文件清单(manifest)
+
+用 os.scandir 对仓库目录只遍历一次，为每个服务器目录记录
+(服务器名称, 语言目录, 路径, 文件列表[相对路径, 大小, 修改时间], 目录列表[相对路径, 修改时间])，
+写入JSON Lines格式的清单文件。代码分析(api/analyzer.py)、
+add_repo_statistics.py 和 enhanced_repo_analysis.py 都可以直接读取该清单，
+不必再各自遍历目录。
+
+清单文件第一行是头部信息，之后每行对应一个服务器目录：
+    {"manifest_version": 2, "base_dir": ..., "layout": ..., "excluded_dirs": [...]}
+    {"server": ..., "language": ..., "path": ..., "is_git": true, "files": [[相对路径, 大小, 修改时间], ...],
+     "dirs": [[相对路径, 修改时间], ...]}
+
+读取时可以要求头部的 base_dir、layout、excluded_dirs 与使用方一致，避免误用为其他目录或其他排除规则
+生成的清单；is_stale 用记录的目录修改时间判断服务器目录的文件列表在生成清单之后是否有变化
+（文件内容的变化由分析时重新读取文件发现，只有指定 verify_files 时才逐个检查文件的大小和修改时间）。
+enhanced_repo_analysis.py 需要全部文件，使用 --no-exclude 生成的清单。
+"""
+import os
+import json
+import argparse
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Set
+
+MANIFEST_VERSION = 2
+
+# 遍历时跳过的依赖和构建目录
+DEFAULT_EXCLUDED_DIRS = {
+    'node_modules',
+    'venv',
+    '.git',
+    '__pycache__',
+    'dist',
+    'build',
+    'target',  # Rust的构建目录
+    'vendor',  # Go的依赖目录
+    'packages', # NuGet包目录
+    'bin',
+    'obj',     # .NET构建目录
+    'lib',
+    'libs',
+    'external',
+    'third_party',
+    'third-party',
+    'ext',
+    'deps',
+    'dependencies'
+}
+
+
+class FileEntry(NamedTuple):
+    """清单中的单个文件"""
+    path: str     # 相对于服务器目录的路径
+    size: int
+    mtime: float
+
+
+class DirEntry(NamedTuple):
+    """清单中遍历过的目录，目录中新增、删除或重命名文件时修改时间会变化"""
+    path: str     # 相对于服务器目录的路径，服务器目录本身为空字符串
+    mtime: float
+
+
+class ServerInventory(NamedTuple):
+    """清单中的单个服务器目录"""
+    server: str
+    language: str  # 语言目录名称，平铺布局时为空字符串
+    path: str      # 服务器目录的绝对路径
+    is_git: bool
+    files: Optional[List[FileEntry]]  # 只列出服务器目录、尚未遍历文件时为None
+    dirs: Optional[List[DirEntry]] = None  # 遍历过的目录，用于判断清单是否过期
+
+
+def list_server_dirs(base_dir: str, excluded_dirs: Set[str], layout: str = 'language') -> List[ServerInventory]:
+    """
+    列出所有服务器目录（不遍历文件，files 为None）
+
+    Args:
+        base_dir: 仓库根目录
+        excluded_dirs: 需要跳过的目录名称
+        layout: 'language' 表示 base_dir/语言/服务器，'flat' 表示 base_dir/服务器
+    """
+    base_dir = os.path.abspath(base_dir)
+    if layout == 'flat':
+        language_dirs = [('', base_dir)]
+    else:
+        language_dirs = []
+        for entry in os.scandir(base_dir):
+            if entry.is_dir() and entry.name not in excluded_dirs:
+                language_dirs.append((entry.name, entry.path))
+
+    servers = []
+    for language, language_path in language_dirs:
+        for entry in os.scandir(language_path):
+            if not entry.is_dir() or entry.name in excluded_dirs:
+                continue
+            servers.append(ServerInventory(
+                server=entry.name,
+                language=language,
+                path=entry.path,
+                is_git=os.path.isdir(os.path.join(entry.path, '.git')),
+                files=None
+            ))
+    return servers
+
+
+def scan_server_files(server_path: str, excluded_dirs: Set[str], dirs: Optional[List[DirEntry]] = None) -> List[FileEntry]:
+    """
+    递归列出服务器目录下的所有文件，顺序与 os.walk 相同（先当前目录的文件，再依次进入子目录）
+
+    dirs 不为None时，把遍历过的目录及其修改时间追加到其中
+    """
+    files = []
+    pending = [('', server_path)]
+    while pending:
+        rel_dir, dir_path = pending.pop()
+        subdirs = []
+        try:
+            if dirs is not None:
+                dirs.append(DirEntry(rel_dir, os.stat(dir_path).st_mtime))
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    # 与 os.walk 一致：不进入符号链接指向的目录
+                    if entry.name not in excluded_dirs and not entry.is_symlink():
+                        subdirs.append((os.path.join(rel_dir, entry.name), entry.path))
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append(FileEntry(os.path.join(rel_dir, entry.name), stat.st_size, stat.st_mtime))
+        # 逆序压栈，保证子目录按列出顺序依次遍历
+        pending.extend(reversed(subdirs))
+    return files
+
+
+def build_inventory(base_dir: str, excluded_dirs: Optional[Set[str]] = None, layout: str = 'language') -> Iterator[ServerInventory]:
+    """遍历仓库目录，依次生成每个服务器目录的清单记录"""
+    excluded_dirs = DEFAULT_EXCLUDED_DIRS if excluded_dirs is None else excluded_dirs
+    for server in list_server_dirs(base_dir, excluded_dirs, layout):
+        dirs = []
+        files = scan_server_files(server.path, excluded_dirs, dirs)
+        yield server._replace(files=files, dirs=dirs)
+
+
+def write_manifest(manifest_path: str, base_dir: str, servers: Iterable[ServerInventory],
+                   excluded_dirs: Optional[Set[str]] = None, layout: str = 'language') -> int:
+    """把清单写入JSON Lines文件，返回写入的服务器数量"""
+    excluded_dirs = DEFAULT_EXCLUDED_DIRS if excluded_dirs is None else excluded_dirs
+    count = 0
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        header = {
+            'manifest_version': MANIFEST_VERSION,
+            'base_dir': os.path.abspath(base_dir),
+            'layout': layout,
+            'excluded_dirs': sorted(excluded_dirs)
+        }
+        f.write(json.dumps(header, ensure_ascii=False) + '\n')
+        for server in servers:
+            record = {
+                'server': server.server,
+                'language': server.language,
+                'path': server.path,
+                'is_git': server.is_git,
+                'files': [list(file_entry) for file_entry in server.files],
+                'dirs': [list(dir_entry) for dir_entry in server.dirs or []]
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def read_manifest(manifest_path: str, base_dir: Optional[str] = None, excluded_dirs: Optional[Set[str]] = None,
+                  layout: Optional[str] = None) -> List[ServerInventory]:
+    """
+    读取清单文件
+
+    指定 base_dir、excluded_dirs、layout 时检查清单头部与之一致，不一致时抛出ValueError
+    """
+    servers = []
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('manifest_version') != MANIFEST_VERSION:
+            raise ValueError(f"不支持的清单版本: {header.get('manifest_version')}，请用 file_inventory.py 重新生成清单")
+        expected = {
+            'base_dir': os.path.abspath(base_dir) if base_dir is not None else None,
+            'layout': layout,
+            'excluded_dirs': sorted(excluded_dirs) if excluded_dirs is not None else None
+        }
+        for key, value in expected.items():
+            if value is not None and header.get(key) != value:
+                raise ValueError(f"清单 {manifest_path} 的 {key} 为 {header.get(key)}，与本次运行的 {value} 不一致，"
+                                 f"请用 file_inventory.py 重新生成清单")
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            servers.append(ServerInventory(
+                server=record['server'],
+                language=record['language'],
+                path=record['path'],
+                is_git=record['is_git'],
+                files=[FileEntry(*file_entry) for file_entry in record['files']],
+                dirs=[DirEntry(*dir_entry) for dir_entry in record['dirs']]
+            ))
+    return servers
+
+
+def is_stale(server: ServerInventory, verify_files: bool = False) -> bool:
+    """
+    服务器目录的文件列表在生成清单之后是否有变化：遍历过的目录修改时间变化（新增、删除或重命名了文件）
+
+    只对每个目录做一次 stat；verify_files 为True时还逐个检查文件的大小和修改时间与清单中的记录是否一致
+    """
+    try:
+        for dir_entry in server.dirs or []:
+            if os.stat(os.path.join(server.path, dir_entry.path)).st_mtime != dir_entry.mtime:
+                return True
+        if not verify_files:
+            return False
+        for file_entry in server.files or []:
+            stat = os.stat(os.path.join(server.path, file_entry.path))
+            if stat.st_size != file_entry.size or stat.st_mtime != file_entry.mtime:
+                return True
+    except OSError:
+        return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成MCP服务器仓库的文件清单')
+    parser.add_argument('--dir', default='../mcp_servers', help='MCP服务器项目所在目录，默认为../mcp_servers')
+    parser.add_argument('--output', default='file_manifest.jsonl', help='清单文件路径，默认为file_manifest.jsonl')
+    parser.add_argument('--layout', choices=['language', 'flat'], default='language',
+                        help='目录布局: language 表示 目录/语言/服务器，flat 表示 目录/服务器 (默认: language)')
+    parser.add_argument('--no-exclude', action='store_true',
+                        help='不跳过依赖和构建目录，列出全部文件（enhanced_repo_analysis.py 需要这种清单） (默认: 跳过)')
+    args = parser.parse_args()
+    excluded_dirs = set() if args.no_exclude else DEFAULT_EXCLUDED_DIRS
+
+    base_dir = os.path.abspath(args.dir)
+    if not os.path.exists(base_dir):
+        print(f"错误: 目录 {base_dir} 不存在")
+        return
+
+    print(f"开始生成 {base_dir} 的文件清单...")
+    file_count = 0
+
+    def counted(servers):
+        nonlocal file_count
+        for server in servers:
+            file_count += len(server.files)
+            yield server
+
+    server_count = write_manifest(args.output, base_dir,
+                                  counted(build_inventory(base_dir, excluded_dirs, layout=args.layout)),
+                                  excluded_dirs, layout=args.layout)
+    print(f"清单已保存到: {args.output}")
+    print(f"- 服务器目录: {server_count}")
+    print(f"- 文件: {file_count}")
+
+
+if __name__ == '__main__':
+    main()
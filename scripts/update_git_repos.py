@@ -1,14 +1,35 @@
 import os
+import json
 import subprocess
 import argparse
+from datetime import datetime
 from pathlib import Path
 
+from file_inventory import list_server_dirs
+
+def get_head(repo_path):
+    """获取仓库当前的HEAD提交，失败时返回None"""
+    result = subprocess.run(
+        ['git', '-C', repo_path, 'rev-parse', 'HEAD'],
+        capture_output=True,
+        text=True
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
 def update_git_repo(repo_path):
-    """更新单个Git仓库到最新版本"""
+    """
+    更新单个Git仓库到最新版本
+
+    Returns:
+        (是否成功, 信息, 更新前的HEAD, 更新后的HEAD)
+    """
     try:
         # 检查是否是Git仓库
         if not os.path.exists(os.path.join(repo_path, '.git')):
-            return False, f"{repo_path} 不是Git仓库"
+            return False, f"{repo_path} 不是Git仓库", None, None
+
+        # 记录更新前的HEAD，供代码分析只重新分析有变化的文件
+        old_head = get_head(repo_path)
 
         # 执行git pull
         result = subprocess.run(
@@ -18,34 +39,40 @@ def update_git_repo(repo_path):
         )
 
         if result.returncode == 0:
-            return True, f"{repo_path} 更新成功: {result.stdout.strip()}"
+            return True, f"{repo_path} 更新成功: {result.stdout.strip()}", old_head, get_head(repo_path)
         else:
-            return False, f"{repo_path} 更新失败: {result.stderr.strip()}"
+            return False, f"{repo_path} 更新失败: {result.stderr.strip()}", old_head, old_head
     except Exception as e:
-        return False, f"{repo_path} 更新出错: {str(e)}"
+        return False, f"{repo_path} 更新出错: {str(e)}", None, None
+
+def update_all_repos(base_dir, record_path=None, layout='flat'):
+    """
+    更新指定目录下的所有Git仓库
 
-def update_all_repos(base_dir):
-    """更新指定目录下的所有Git仓库"""
+    record_path 不为None时，把每个仓库更新前后的HEAD写入该JSON文件，
+    供 api/analyzer.py --git-updates 只重新分析 git diff 中有变化的文件（分析器的目录使用 language 布局）
+    """
     if not os.path.exists(base_dir):
         print(f"错误: 目录 {base_dir} 不存在")
         return
 
-    # 获取目录下的所有子目录
-    subdirs = [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
+    # 获取目录下的所有项目目录
+    repo_dirs = [server.path for server in list_server_dirs(base_dir, set(), layout)]
 
-    if not subdirs:
+    if not repo_dirs:
         print(f"警告: 目录 {base_dir} 下没有子目录")
         return
 
-    print(f"发现 {len(subdirs)} 个项目，开始更新...")
+    print(f"发现 {len(repo_dirs)} 个项目，开始更新...")
 
     success_count = 0
     fail_count = 0
+    changed_count = 0
     fail_details = []
+    head_records = []
 
-    for subdir in subdirs:
-        repo_path = os.path.join(base_dir, subdir)
-        success, message = update_git_repo(repo_path)
+    for repo_path in repo_dirs:
+        success, message, old_head, new_head = update_git_repo(repo_path)
         if success:
             success_count += 1
             print(f"✅ {message}")
@@ -53,24 +80,44 @@ def update_all_repos(base_dir):
             fail_count += 1
             fail_details.append(message)
             print(f"❌ {message}")
+        if old_head:
+            head_records.append({'path': repo_path, 'old_head': old_head, 'new_head': new_head})
+            if new_head != old_head:
+                changed_count += 1
 
     print("\n更新结果总结:")
     print(f"✅ 成功更新: {success_count}")
     print(f"❌ 更新失败: {fail_count}")
+    print(f"有新提交的项目: {changed_count}")
 
     if fail_count > 0:
         print("\n失败详情:")
         for detail in fail_details:
             print(f"  - {detail}")
 
+    if record_path:
+        with open(record_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'base_dir': base_dir,
+                'layout': layout,
+                'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'repos': head_records
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n更新前后的HEAD已保存到: {record_path}")
+
 if __name__ == '__main__':
     # 解析命令行参数
     parser = argparse.ArgumentParser(description='更新MCP服务器项目到最新版本')
     parser.add_argument('--dir', default='../mcp_servers', help='MCP服务器项目所在目录，默认为../mcp_servers')
+    parser.add_argument('--layout', choices=['flat', 'language'], default='flat',
+                        help='目录布局: flat 表示 目录/项目，language 表示 目录/语言/项目 (默认: flat)')
+    parser.add_argument('--record', default=None,
+                        help='保存每个项目更新前后HEAD的JSON文件，供 api/analyzer.py --git-updates 增量分析，'
+                             '此时需要同时指定 --layout language (默认: 不保存)')
     args = parser.parse_args()
 
     # 转换为绝对路径
     base_dir = os.path.abspath(args.dir)
 
     print(f"开始更新 {base_dir} 目录下的所有MCP服务器项目...")
-    update_all_repos(base_dir)
\ No newline at end of file
+    update_all_repos(base_dir, args.record, args.layout)